@@ -0,0 +1,194 @@
+""" Goal-directed shortest paths using A* and ALT (A*, Landmarks, Triangle inequality) """
+
+import sys
+import struct
+from array import array
+from graph_structs import Graph, Vertex
+from heaps import IndexedMinHeap
+from shortest_one_to_all import reconstruct_path, reverse_adjacency
+
+
+INF = float("inf")
+
+
+def astar(G, s, t, h=None):
+    """
+        Find the shortest path from s to t with A*, where h(v) is a lower bound for the distance from v to t.
+        Vertices are extracted in order of v.d + h(v), so a good heuristic settles far fewer vertices than Dijkstra.
+        Without h this is the same as Dijkstra stopped at t. Works only with non-negative edges.\n
+        Returns the distance and the path as a list of vertices, or (sys.maxsize, []) if t can not be reached
+    """
+    if h is None:
+        h = lambda v: 0
+
+    d = {s: 0}
+    p = {s: None}
+    Q = IndexedMinHeap([(s, h(s))])
+    while Q.size() > 0:
+        u = Q.extract_min()
+        if u == t:
+            return d[t], reconstruct_path(p, t)
+        for v, weight in G.adj(u):
+            if v not in d or d[v] > d[u] + weight:
+                d[v] = d[u] + weight
+                p[v] = u
+                # a vertex that was already extracted is inserted again, in case h is admissible but not consistent
+                if v in Q:
+                    Q.decrease_key(v, d[v] + h(v))
+                else:
+                    Q.insert(v, d[v] + h(v))
+    return sys.maxsize, []
+
+
+def distances(adj, s):
+    """ Returns a dict with the distance from s to every vertex reachable from s, where adj(u) gives the edges out of u """
+    d = {s: 0}
+    Q = IndexedMinHeap([(s, 0)])
+    while Q.size() > 0:
+        u = Q.extract_min()
+        for v, weight in adj(u):
+            if v not in d or d[v] > d[u] + weight:
+                d[v] = d[u] + weight
+                if v in Q:
+                    Q.decrease_key(v, d[v])
+                else:
+                    Q.insert(v, d[v])
+    return d
+
+
+class Landmarks:
+    """
+        Precomputed distances from and to a few landmark vertices, used as lower bounds in A*.
+        By the triangle inequality dist(v, t) >= dist(L, t) - dist(L, v) and dist(v, t) >= dist(v, L) - dist(t, L)
+        for every landmark L. The tables are indexed by the position of a vertex in G.V
+    """
+
+    # file format: magic, number of vertices, number of landmarks, landmark indexes, then for each landmark
+    # the distances from it and the distances to it as doubles (inf if not reachable)
+    MAGIC = b"ALT1"
+
+    def __init__(self, G, landmarks, from_landmark, to_landmark):
+        """ landmarks is a list of vertex indexes, from_landmark[i][v] and to_landmark[i][v] are arrays of distances """
+        self.G = G
+        self.index = {v: i for i, v in enumerate(G.V)}
+        self.landmarks = landmarks
+        self.from_landmark = from_landmark
+        self.to_landmark = to_landmark
+
+    @classmethod
+    def build(cls, G, k=4):
+        """
+            Chooses k landmarks by farthest-first selection, such that every new landmark is the vertex
+            farthest away from the landmarks chosen so far, and computes the distance tables
+        """
+        n = len(G.V)
+        reverse = reverse_adjacency(G)
+        landmarks = []
+        from_landmark = []
+        to_landmark = []
+
+        # min_distance[v] is the distance from the closest landmark so far, the first landmark is G.V[0]
+        min_distance = [INF] * n
+        next_landmark = 0
+        for _ in range(min(k, n)):
+            L = G.V[next_landmark]
+            landmarks.append(next_landmark)
+            d_from = distances(G.adj, L)
+            d_to = distances(reverse.__getitem__, L)
+            from_landmark.append(array("d", (d_from.get(v, INF) for v in G.V)))
+            to_landmark.append(array("d", (d_to.get(v, INF) for v in G.V)))
+
+            for i in range(n):
+                min_distance[i] = min(min_distance[i], from_landmark[-1][i])
+            # the farthest vertex reachable from a landmark, or an unreachable one if there is any
+            candidates = [i for i in range(n) if i not in landmarks]
+            if not candidates:
+                break
+            next_landmark = max(candidates, key=lambda i: min_distance[i])
+
+        return cls(G, landmarks, from_landmark, to_landmark)
+
+    def heuristic(self, t):
+        """ Returns the lower bound h(v) for the distance from v to t given by the landmarks """
+        j = self.index[t]
+        tables = [
+            (d_from, d_to, d_from[j], d_to[j])
+            for d_from, d_to in zip(self.from_landmark, self.to_landmark)
+        ]
+
+        def h(v):
+            i = self.index[v]
+            bound = 0
+            for d_from, d_to, from_to_t, t_to_landmark in tables:
+                # bounds involving unreachable vertices are skipped
+                if from_to_t < INF and d_from[i] < INF:
+                    bound = max(bound, from_to_t - d_from[i])
+                if d_to[i] < INF and t_to_landmark < INF:
+                    bound = max(bound, d_to[i] - t_to_landmark)
+            return bound
+
+        return h
+
+    def save(self, filename):
+        """ Writes the landmark tables to a binary file, such that they can be loaded without recomputing them """
+        with open(filename, "wb") as f:
+            f.write(self.MAGIC)
+            f.write(struct.pack("<qq", len(self.G.V), len(self.landmarks)))
+            array("q", self.landmarks).tofile(f)
+            for d_from, d_to in zip(self.from_landmark, self.to_landmark):
+                d_from.tofile(f)
+                d_to.tofile(f)
+
+    @classmethod
+    def load(cls, G, filename):
+        """ Reads landmark tables written by save, for the same graph G """
+        with open(filename, "rb") as f:
+            if f.read(len(cls.MAGIC)) != cls.MAGIC:
+                raise ValueError("Not a landmark file")
+            n, k = struct.unpack("<qq", f.read(16))
+            if n != len(G.V):
+                raise ValueError("Landmark file does not match the graph")
+            landmarks = array("q")
+            landmarks.fromfile(f, k)
+            from_landmark = []
+            to_landmark = []
+            for _ in range(k):
+                d_from = array("d")
+                d_from.fromfile(f, n)
+                d_to = array("d")
+                d_to.fromfile(f, n)
+                from_landmark.append(d_from)
+                to_landmark.append(d_to)
+        return cls(G, list(landmarks), from_landmark, to_landmark)
+
+
+def alt(G, s, t, landmarks):
+    """ Find the shortest path from s to t with A*, using the landmark lower bounds as heuristic """
+    return astar(G, s, t, landmarks.heuristic(t))
+
+
+def test():
+    """ Testing A* and ALT """
+    s = Vertex("s")
+    t = Vertex("t")
+    x = Vertex("x")
+    y = Vertex("y")
+    z = Vertex("z")
+
+    s.add_edge(t, 10)
+    s.add_edge(y, 5)
+    t.add_edge(x, 1)
+    t.add_edge(y, 2)
+    x.add_edge(z, 4)
+    y.add_edge(t, 3)
+    y.add_edge(x, 9)
+    y.add_edge(z, 2)
+    z.add_edge(s, 7)
+    z.add_edge(x, 6)
+
+    g = Graph(s, t, x, y, z)
+    print(f"A* from {s} to {x}:", astar(g, s, x))
+    landmarks = Landmarks.build(g, 2)
+    print(f"ALT from {s} to {x}:", alt(g, s, x, landmarks))
+
+# test()
@@ -0,0 +1,424 @@
+""" Benchmarks of the algorithms on generated graphs and arrays, measuring time and peak memory over sweeps of input sizes """
+
+import argparse
+import contextlib
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from graph_structs import Graph, Vertex
+
+
+# ---------------------------------------------------------------- graph generators
+
+
+def _vertices(n):
+    """ Returns n vertices named 0 ... n - 1 """
+    return [Vertex(i, rank=i) for i in range(n)]
+
+
+def random_graph(n, m, seed=0, max_weight=100, undirected=False):
+    """ Graph with n vertices and m random edges with weights 1 ... max_weight (m pairs of edges if undirected) """
+    rng = random.Random(seed)
+    V = _vertices(n)
+    for _ in range(m):
+        u = rng.randrange(n)
+        v = rng.randrange(n)
+        weight = rng.randint(1, max_weight)
+        V[u].add_edge(V[v], weight)
+        if undirected:
+            V[v].add_edge(V[u], weight)
+    return Graph(*V)
+
+
+def grid_graph(rows, cols, seed=0, max_weight=100):
+    """ Graph of a rows x cols grid, where every cell has edges in both directions to its neighbours (like a road network) """
+    rng = random.Random(seed)
+    V = _vertices(rows * cols)
+    for r in range(rows):
+        for c in range(cols):
+            u = V[r * cols + c]
+            for v in ([V[r * cols + c + 1]] if c + 1 < cols else []) + ([V[(r + 1) * cols + c]] if r + 1 < rows else []):
+                weight = rng.randint(1, max_weight)
+                u.add_edge(v, weight)
+                v.add_edge(u, weight)
+    return Graph(*V)
+
+
+def power_law_graph(n, edges_per_vertex=3, seed=0, max_weight=100):
+    """
+        Graph with a power-law degree distribution (Barabási-Albert), where every new vertex gets edges in both
+        directions to edges_per_vertex existing vertices, picked with probability proportional to their degree
+    """
+    rng = random.Random(seed)
+    V = _vertices(n)
+    # every vertex appears once for each edge it has, so a random element is picked proportional to degree
+    endpoints = []
+    for u in range(n):
+        targets = {rng.choice(endpoints) for _ in range(edges_per_vertex)} if endpoints else set()
+        for v in targets:
+            weight = rng.randint(1, max_weight)
+            V[u].add_edge(V[v], weight)
+            V[v].add_edge(V[u], weight)
+            endpoints.extend((u, v))
+        endpoints.append(u)
+    return Graph(*V)
+
+
+def random_dag(n, m, seed=0, max_weight=100, negative=False):
+    """ Directed acyclic graph with n vertices and m random edges, all going from a lower to a higher vertex in a random order """
+    rng = random.Random(seed)
+    V = _vertices(n)
+    order = list(range(n))
+    rng.shuffle(order)
+    for _ in range(m):
+        i, j = sorted(rng.sample(range(n), 2))
+        weight = rng.randint(-max_weight if negative else 1, max_weight)
+        V[order[i]].add_edge(V[order[j]], weight)
+    return Graph(*V)
+
+
+# ---------------------------------------------------------------- array generators
+
+
+def random_array(n, seed=0):
+    """ n random integers in [0, n) """
+    rng = random.Random(seed)
+    return [rng.randrange(n) for _ in range(n)]
+
+
+def sorted_array(n, seed=0):
+    """ The integers 0 ... n - 1 in increasing order """
+    return list(range(n))
+
+
+def reverse_array(n, seed=0):
+    """ The integers 0 ... n - 1 in decreasing order """
+    return list(range(n - 1, -1, -1))
+
+
+def duplicate_array(n, seed=0, distinct=10):
+    """ n random integers with only distinct different values """
+    rng = random.Random(seed)
+    return [rng.randrange(distinct) for _ in range(n)]
+
+
+def uniform_array(n, seed=0):
+    """ n random floats in [0, 1), for bucket sort """
+    rng = random.Random(seed)
+    return [rng.random() for _ in range(n)]
+
+
+ARRAYS = {
+    "random": random_array,
+    "sorted": sorted_array,
+    "reverse": reverse_array,
+    "duplicates": duplicate_array,
+}
+
+
+# ---------------------------------------------------------------- benchmarks
+
+
+class Benchmark:
+    """
+        A benchmark of one algorithm on one kind of input. setup(size, seed) makes the input (not measured) and returns
+        the arguments for run, which is measured. sizes is the sweep of input sizes
+    """
+
+    def __init__(self, module, name, setup, run, sizes):
+        self.module = module
+        self.name = name
+        self.setup = setup
+        self.run = run
+        self.sizes = sizes
+
+
+def _sorting_benchmarks():
+    import sorting
+
+    benchmarks = []
+    sorts = [
+        ("insertion_sort", sorting.insertion_sort, [250, 500, 1000]),
+        ("merge_sort", lambda A: sorting.merge_sort(A, 0, len(A) - 1), [2000, 8000, 32000]),
+        ("adaptive_merge_sort", sorting.adaptive_merge_sort, [2000, 8000, 32000]),
+        # the recursion of quicksort is as deep as the array on sorted input
+        ("quicksort", lambda A: sorting.quicksort(A, 0, len(A) - 1), [200, 400, 800]),
+        ("randomized_quicksort", lambda A: sorting.randomized_quicksort(A, 0, len(A) - 1), [2000, 8000, 32000]),
+        ("introsort", sorting.introsort, [2000, 8000, 32000]),
+        ("heapsort", lambda A: sorting.heapsort(A, 0, len(A) - 1), [2000, 8000, 32000]),
+        ("counting_sort", lambda A: sorting.counting_sort(A, max(A)), [2000, 8000, 32000]),
+        ("radix_sort", sorting.radix_sort, [2000, 8000, 32000]),
+        ("sorted", lambda A: A.sort(), [2000, 8000, 32000]),
+    ]
+    for name, run, sizes in sorts:
+        for kind, generator in ARRAYS.items():
+            # Lomuto partitioning is quadratic when there are many equal elements
+            kind_sizes = [200, 400, 800] if name == "randomized_quicksort" and kind == "duplicates" else sizes
+            setup = lambda size, seed, generator=generator: (generator(size, seed),)
+            benchmarks.append(Benchmark("sorting", f"{name}[{kind}]", setup, run, kind_sizes))
+    benchmarks.append(Benchmark("sorting", "bucket_sort[uniform]", lambda size, seed: (uniform_array(size, seed),), sorting.bucket_sort, [2000, 8000, 32000]))
+    benchmarks.append(Benchmark(
+        "sorting",
+        "randomized_select[random]",
+        lambda size, seed: (random_array(size, seed),),
+        lambda A: sorting.randomized_select(A, 0, len(A) - 1, len(A) // 2 + 1),
+        [2000, 8000, 32000],
+    ))
+    return benchmarks
+
+
+def _heap_benchmarks():
+    from heaps import MinHeap, IndexedMinHeap
+
+    def heap_sort(A):
+        heap = MinHeap(A)
+        while heap.size() > 0:
+            heap.extract_min()
+
+    def indexed_heap(A):
+        heap = IndexedMinHeap()
+        for i, key in enumerate(A):
+            heap.insert(i, key)
+        for i in range(0, len(A), 2):
+            heap.decrease_key(i, heap.key(i) - 1)
+        while heap.size() > 0:
+            heap.extract_min()
+
+    return [
+        Benchmark("heaps", "MinHeap.extract_min[random]", lambda size, seed: (random_array(size, seed),), heap_sort, [2000, 8000, 32000]),
+        Benchmark("heaps", "IndexedMinHeap[random]", lambda size, seed: (random_array(size, seed),), indexed_heap, [2000, 8000, 32000]),
+    ]
+
+
+def _graphs(undirected=False):
+    """ Returns the setups for a random, grid and power-law graph with about the given number of vertices """
+    return {
+        "random": lambda size, seed: (random_graph(size, 4 * size, seed, undirected=undirected),),
+        "grid": lambda size, seed: (grid_graph(int(size ** 0.5), int(size ** 0.5), seed),),
+        "power_law": lambda size, seed: (power_law_graph(size, 2, seed),),
+    }
+
+
+def _traversal_benchmarks():
+    from graph_traversal import BFS, breadth_first_search, depth_first_search, topological_sort
+
+    sizes = [1000, 4000, 16000]
+    benchmarks = []
+    for kind, setup in _graphs().items():
+        benchmarks.append(Benchmark("graph_traversal", f"BFS[{kind}]", setup, lambda G: BFS(G, G.V[0]), sizes))
+        benchmarks.append(Benchmark("graph_traversal", f"breadth_first_search[{kind}]", setup, lambda G: breadth_first_search(G, [G.V[0]]), sizes))
+        benchmarks.append(Benchmark("graph_traversal", f"depth_first_search[{kind}]", setup, depth_first_search, sizes))
+    benchmarks.append(Benchmark("graph_traversal", "topological_sort[dag]", lambda size, seed: (random_dag(size, 4 * size, seed),), topological_sort, sizes))
+    return benchmarks
+
+
+def _sssp_benchmarks():
+    from shortest_one_to_all import bellman_ford, bellman_ford_queue, bidirectional_dijkstra, DAG_shortest_paths, dijkstra
+
+    sizes = [1000, 4000, 16000]
+    benchmarks = []
+    for kind, setup in _graphs().items():
+        benchmarks.append(Benchmark("shortest_one_to_all", f"dijkstra[{kind}]", setup, lambda G: dijkstra(G, G.V[0]), sizes))
+        benchmarks.append(Benchmark("shortest_one_to_all", f"bellman_ford_queue[{kind}]", setup, lambda G: bellman_ford_queue(G, G.V[0]), sizes))
+        benchmarks.append(Benchmark("shortest_one_to_all", f"bidirectional_dijkstra[{kind}]", setup, lambda G: bidirectional_dijkstra(G, G.V[0], G.V[-1]), sizes))
+        benchmarks.append(Benchmark("shortest_one_to_all", f"bellman_ford[{kind}]", setup, lambda G: bellman_ford(G, G.V[0]), [100, 200, 400]))
+    benchmarks.append(Benchmark(
+        "shortest_one_to_all",
+        "DAG_shortest_paths[dag]",
+        lambda size, seed: (random_dag(size, 4 * size, seed, negative=True),),
+        lambda G: DAG_shortest_paths(G, G.V[0]),
+        sizes,
+    ))
+    return benchmarks
+
+
+def _apsp_benchmarks():
+    from shortest_all_to_all import floyd_warshall, floyd_warshall_vectorized, johnson
+
+    benchmarks = []
+    for kind, setup in _graphs().items():
+        benchmarks.append(Benchmark("shortest_all_to_all", f"floyd_warshall[{kind}]", setup, floyd_warshall, [36, 64, 100]))
+        benchmarks.append(Benchmark("shortest_all_to_all", f"johnson[{kind}]", setup, johnson, [36, 64, 100]))
+        with contextlib.suppress(ImportError):
+            import numpy
+            benchmarks.append(Benchmark("shortest_all_to_all", f"floyd_warshall_vectorized[{kind}]", setup, floyd_warshall_vectorized, [100, 196, 400]))
+    return benchmarks
+
+
+def _mst_benchmarks():
+    from mst import boruvka, kruskal, prim, prim_dense, prim_heap
+
+    sizes = [1000, 4000, 16000]
+    benchmarks = []
+    for kind, setup in _graphs(undirected=True).items():
+        benchmarks.append(Benchmark("mst", f"kruskal[{kind}]", setup, kruskal, sizes))
+        benchmarks.append(Benchmark("mst", f"boruvka[{kind}]", setup, boruvka, sizes))
+        benchmarks.append(Benchmark("mst", f"prim[{kind}]", setup, lambda G: prim(G, G.V[0]), sizes))
+        benchmarks.append(Benchmark("mst", f"prim_heap[{kind}]", setup, lambda G: prim_heap(G, G.V[0]), sizes))
+    benchmarks.append(Benchmark(
+        "mst",
+        "prim_dense[complete]",
+        lambda size, seed: (random_graph(size, size * size // 2, seed, undirected=True),),
+        lambda G: prim_dense(G, G.V[0]),
+        [50, 100, 200],
+    ))
+    return benchmarks
+
+
+def _dynamic_prog_benchmarks():
+    from dynamic_prog import binary_knapsack, Item, LCS, rod_cut
+
+    def strings(size, seed):
+        rng = random.Random(seed)
+        return ["".join(rng.choice("ACGT") for _ in range(size)) for _ in range(2)]
+
+    def prices(size, seed):
+        rng = random.Random(seed)
+        return [0] + [i + rng.randint(0, i) for i in range(1, size + 1)], size
+
+    def items(size, seed):
+        rng = random.Random(seed)
+        return [Item(rng.randint(1, 50), rng.randint(1, 100)) for _ in range(size)], 10 * size
+
+    return [
+        Benchmark("dynamic_prog", "LCS[dna]", strings, LCS, [50, 100, 200]),
+        Benchmark("dynamic_prog", "rod_cut[random]", prices, rod_cut, [100, 200, 400]),
+        Benchmark("dynamic_prog", "binary_knapsack[random]", items, binary_knapsack, [25, 50, 100]),
+    ]
+
+
+def benchmarks():
+    """ Returns every benchmark """
+    return (
+        _sorting_benchmarks()
+        + _heap_benchmarks()
+        + _traversal_benchmarks()
+        + _sssp_benchmarks()
+        + _apsp_benchmarks()
+        + _mst_benchmarks()
+        + _dynamic_prog_benchmarks()
+    )
+
+
+# ---------------------------------------------------------------- measuring
+
+
+def measure(benchmark, size, seed=0, repeat=3):
+    """
+        Runs benchmark on an input of the given size repeat times, and returns the fastest time in seconds and
+        the peak memory in bytes allocated while running it once more with tracemalloc (which makes it slower, so the
+        time is measured without it). The input is made again before every run, since some algorithms change it
+    """
+    # some of the algorithms print their results, which is not part of what is measured
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        times = []
+        for _ in range(repeat):
+            args = benchmark.setup(size, seed)
+            gc.collect()
+            start = time.perf_counter()
+            benchmark.run(*args)
+            times.append(time.perf_counter() - start)
+            del args
+
+        args = benchmark.setup(size, seed)
+        gc.collect()
+        tracemalloc.start()
+        try:
+            benchmark.run(*args)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return min(times), peak
+
+
+def run(selected=None, scale=1.0, seed=0, repeat=3, log=sys.stderr):
+    """
+        Runs the benchmarks whose "module.name" contains one of the strings in selected (all if None), with the
+        sizes multiplied by scale. Returns the results as a dict that can be written as json
+    """
+    # the recursive algorithms (merge sort, quicksort and randomized select) need deeper recursion than the default
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 100000))
+    results = []
+    for benchmark in benchmarks():
+        full_name = f"{benchmark.module}.{benchmark.name}"
+        if selected and not any(pattern in full_name for pattern in selected):
+            continue
+        for size in benchmark.sizes:
+            size = max(2, int(size * scale))
+            seconds, peak = measure(benchmark, size, seed, repeat)
+            results.append({
+                "module": benchmark.module,
+                "benchmark": benchmark.name,
+                "size": size,
+                "seconds": seconds,
+                "peak_bytes": peak,
+            })
+            if log is not None:
+                print(f"{full_name:60} {size:>8} {seconds:12.6f} s {peak / 1024:12.1f} KiB", file=log)
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "seed": seed,
+        "scale": scale,
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare(baseline, current, threshold=1.1):
+    """
+        Compares two results from run (or their json files), and returns a list of
+        (module.benchmark, size, time ratio, memory ratio, regressed) for the measurements in both, where a ratio is
+        current / baseline and regressed is True if a ratio is larger than threshold
+    """
+    if isinstance(baseline, str):
+        with open(baseline) as f:
+            baseline = json.load(f)
+    if isinstance(current, str):
+        with open(current) as f:
+            current = json.load(f)
+    old = {(r["module"], r["benchmark"], r["size"]): r for r in baseline["results"]}
+    rows = []
+    for r in current["results"]:
+        key = (r["module"], r["benchmark"], r["size"])
+        if key not in old:
+            continue
+        time_ratio = r["seconds"] / old[key]["seconds"] if old[key]["seconds"] > 0 else float("inf")
+        memory_ratio = r["peak_bytes"] / old[key]["peak_bytes"] if old[key]["peak_bytes"] > 0 else 1.0
+        rows.append((f"{key[0]}.{key[1]}", key[2], time_ratio, memory_ratio, time_ratio > threshold or memory_ratio > threshold))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks of the algorithms, writing the results as json")
+    parser.add_argument("filter", nargs="*", help="only run benchmarks whose module.name contains one of these")
+    parser.add_argument("-o", "--output", help="json file to write the results to")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplies every input size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--compare", help="json file with earlier results to compare with")
+    parser.add_argument("--threshold", type=float, default=1.1, help="ratio counted as a regression when comparing")
+    args = parser.parse_args(argv)
+
+    results = run(args.filter, args.scale, args.seed, args.repeat)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=1)
+    if args.compare:
+        regressions = 0
+        for name, size, time_ratio, memory_ratio, regressed in compare(args.compare, results, args.threshold):
+            regressions += regressed
+            print(f"{name:60} {size:>8} time x{time_ratio:6.2f} memory x{memory_ratio:6.2f}{'  REGRESSION' if regressed else ''}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
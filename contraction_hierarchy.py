@@ -0,0 +1,225 @@
+""" Contraction Hierarchies for fast repeated shortest path queries on a graph that rarely changes """
+
+import sys
+import instrumentation
+from graph_structs import Graph, Vertex
+from heaps import IndexedMinHeap
+
+
+INF = float("inf")
+
+
+class ContractionHierarchy:
+    """
+        Preprocesses G by contracting the vertices one at a time in order of importance. When a vertex v is
+        contracted, a shortcut u -> w is added for every path u -> v -> w that is the only shortest path
+        between u and w (checked with a local witness search). A query only follows edges going up in the order,
+        from both s and t, which settles very few vertices. Works only with non-negative edges
+    """
+
+    def __init__(self, G, settle_limit=50):
+        """ Builds the hierarchy, settle_limit is the maximal number of vertices settled by a witness search """
+        self.G = G
+        self.index = {v: i for i, v in enumerate(G.V)}
+        self.settle_limit = settle_limit
+
+        n = len(G.V)
+        # remaining graph during contraction: out_edges[u][v] = in_edges[v][u] = weight of u -> v
+        self.out_edges = [{} for _ in range(n)]
+        self.in_edges = [{} for _ in range(n)]
+        # middle[(u, v)] is the vertex a shortcut u -> v was added for, or None for an edge of G
+        self.middle = {}
+        for u in G.V:
+            i = self.index[u]
+            for v, weight in G.adj(u):
+                j = self.index[v]
+                if i != j and weight < self.out_edges[i].get(j, INF):
+                    self.out_edges[i][j] = weight
+                    self.in_edges[j][i] = weight
+                    self.middle[(i, j)] = None
+
+        # rank[v] is the position of v in the contraction order
+        self.rank = [0] * n
+        # edges to vertices contracted later, used by the forward and backward query
+        self.forward_up = [[] for _ in range(n)]
+        self.backward_up = [[] for _ in range(n)]
+        self.shortcuts = 0
+
+        with instrumentation.phase("contraction_hierarchy.contract"):
+            self._contract_all()
+        del self.out_edges, self.in_edges
+        counts = instrumentation.counts()
+        if counts is not None:
+            counts["shortcuts"] += self.shortcuts
+
+    def _witness_search(self, s, excluded, limit):
+        """ Dijkstra from s in the remaining graph without excluded, stopped at distance limit or after settle_limit vertices """
+        d = {s: 0}
+        Q = IndexedMinHeap([(s, 0)])
+        settled = 0
+        while Q.size() > 0 and settled < self.settle_limit:
+            u = Q.extract_min()
+            if d[u] > limit:
+                break
+            settled += 1
+            for v, weight in self.out_edges[u].items():
+                if v != excluded and d[u] + weight < d.get(v, INF):
+                    d[v] = d[u] + weight
+                    if v in Q:
+                        Q.decrease_key(v, d[v])
+                    else:
+                        Q.insert(v, d[v])
+        return d
+
+    def _shortcuts(self, v):
+        """ Returns the shortcuts (u, w, weight) needed if v is contracted """
+        shortcuts = []
+        if not self.out_edges[v]:
+            return shortcuts
+        for u, weight_in in self.in_edges[v].items():
+            # lengths of the paths u -> v -> w
+            via = {w: weight_in + weight_out for w, weight_out in self.out_edges[v].items() if w != u}
+            if not via:
+                continue
+            d = self._witness_search(u, v, max(via.values()))
+            for w, weight in via.items():
+                if d.get(w, INF) > weight:
+                    shortcuts.append((u, w, weight))
+        return shortcuts
+
+    def _priority(self, v, shortcuts, contracted_neighbors):
+        """ Importance of v: the edge difference of contracting it, plus its number of contracted neighbors """
+        removed = len(self.in_edges[v]) + len(self.out_edges[v])
+        return len(shortcuts) - removed + contracted_neighbors[v]
+
+    def _contract_all(self):
+        """ Contracts the vertices in order of priority, updating priorities lazily """
+        n = len(self.G.V)
+        contracted_neighbors = [0] * n
+        Q = IndexedMinHeap((v, self._priority(v, self._shortcuts(v), contracted_neighbors)) for v in range(n))
+        next_rank = 0
+        while Q.size() > 0:
+            v = Q.extract_min()
+            # the priority may be outdated, so recompute it and put v back if it is no longer the smallest
+            shortcuts = self._shortcuts(v)
+            priority = self._priority(v, shortcuts, contracted_neighbors)
+            if Q.size() > 0 and priority > Q.key(Q.minimum()):
+                Q.insert(v, priority)
+                continue
+
+            self.rank[v] = next_rank
+            next_rank += 1
+            for u, w, weight in shortcuts:
+                if weight < self.out_edges[u].get(w, INF):
+                    self.out_edges[u][w] = weight
+                    self.in_edges[w][u] = weight
+                    self.middle[(u, w)] = v
+                    self.shortcuts += 1
+
+            # the remaining edges of v go up in the hierarchy, and are removed from the remaining graph
+            for w, weight in self.out_edges[v].items():
+                self.forward_up[v].append((w, weight))
+                del self.in_edges[w][v]
+                contracted_neighbors[w] += 1
+            for u, weight in self.in_edges[v].items():
+                self.backward_up[v].append((u, weight))
+                del self.out_edges[u][v]
+                contracted_neighbors[u] += 1
+            self.out_edges[v] = {}
+            self.in_edges[v] = {}
+
+    def _unpack(self, u, v):
+        """ Returns the vertices after u on the path in G that the (possibly shortcut) edge u -> v represents """
+        path = []
+        stack = [(u, v)]
+        while stack:
+            a, b = stack.pop()
+            middle = self.middle[(a, b)]
+            if middle is None:
+                path.append(b)
+            else:
+                # the second half is pushed first, such that the first half is unpacked first
+                stack.append((middle, b))
+                stack.append((a, middle))
+        return path
+
+    def query(self, s, t):
+        """
+            Find the shortest path from s to t with a bidirectional Dijkstra going only upwards in the hierarchy.
+            Returns the distance and the path as a list of vertices, or (sys.maxsize, []) if t can not be reached
+        """
+        i, j = self.index[s], self.index[t]
+        # index 0 is the forward search from s, index 1 is the backward search from t
+        d = ({i: 0}, {j: 0})
+        p = ({i: None}, {j: None})
+        Q = (IndexedMinHeap([(i, 0)]), IndexedMinHeap([(j, 0)]))
+        up = (self.forward_up, self.backward_up)
+        best = INF
+        meeting = None
+
+        while Q[0].size() > 0 or Q[1].size() > 0:
+            # expand the search with the smallest key, a search is done when its smallest key is at least best
+            keys = [Q[k].key(Q[k].minimum()) if Q[k].size() > 0 else INF for k in (0, 1)]
+            k = 0 if keys[0] <= keys[1] else 1
+            if keys[k] >= best:
+                break
+            u = Q[k].extract_min()
+            if u in d[1 - k] and d[k][u] + d[1 - k][u] < best:
+                best = d[k][u] + d[1 - k][u]
+                meeting = u
+            for v, weight in up[k][u]:
+                if d[k][u] + weight < d[k].get(v, INF):
+                    d[k][v] = d[k][u] + weight
+                    p[k][v] = u
+                    if v in Q[k]:
+                        Q[k].decrease_key(v, d[k][v])
+                    else:
+                        Q[k].insert(v, d[k][v])
+
+        if meeting is None:
+            return sys.maxsize, []
+
+        # the edges s -> ... -> meeting and meeting -> ... -> t in the hierarchy
+        edges = []
+        v = meeting
+        while p[0][v] is not None:
+            edges.append((p[0][v], v))
+            v = p[0][v]
+        edges.reverse()
+        v = meeting
+        while p[1][v] is not None:
+            edges.append((v, p[1][v]))
+            v = p[1][v]
+
+        path = [i]
+        for u, v in edges:
+            path += self._unpack(u, v)
+        return best, [self.G.V[v] for v in path]
+
+
+def test():
+    """ Testing contraction hierarchies """
+    s = Vertex("s")
+    t = Vertex("t")
+    x = Vertex("x")
+    y = Vertex("y")
+    z = Vertex("z")
+
+    s.add_edge(t, 10)
+    s.add_edge(y, 5)
+    t.add_edge(x, 1)
+    t.add_edge(y, 2)
+    x.add_edge(z, 4)
+    y.add_edge(t, 3)
+    y.add_edge(x, 9)
+    y.add_edge(z, 2)
+    z.add_edge(s, 7)
+    z.add_edge(x, 6)
+
+    g = Graph(s, t, x, y, z)
+    ch = ContractionHierarchy(g)
+    print(f"Shortcuts added: {ch.shortcuts}")
+    for v in g.V:
+        print(f"Shortest path from {s} to {v}:", ch.query(s, v))
+
+# test()
@@ -0,0 +1,65 @@
+""" Disjoint-set (union-find) data structure for the integers 0 ... n - 1 """
+
+from array import array
+
+
+class DisjointSet:
+    """
+        Disjoint sets of the elements 0 ... n - 1, stored in two arrays. find uses path halving (every element
+        on the path is linked to its grandparent) and union links the root of the smaller set to the root of the larger,
+        so both take nearly constant amortized time without recursion
+    """
+
+    def __init__(self, n):
+        """ Initializes n sets with one element each """
+        self.parent = array("q", range(n))
+        self.size = array("q", [1]) * n
+        self.count = n
+
+    def __len__(self):
+        return len(self.parent)
+
+    def find(self, x):
+        """ Returns the root of the set containing x """
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(self, x, y):
+        """ Unites the sets containing x and y, returns False if they already were the same set """
+        x = self.find(x)
+        y = self.find(y)
+        if x == y:
+            return False
+        if self.size[x] < self.size[y]:
+            x, y = y, x
+        self.parent[y] = x
+        self.size[x] += self.size[y]
+        self.count -= 1
+        return True
+
+    def same_set(self, x, y):
+        """ Returns True if x and y are in the same set """
+        return self.find(x) == self.find(y)
+
+    def find_all(self, elements=None):
+        """ Returns the roots of the given elements (all elements if None) as an array """
+        if elements is None:
+            elements = range(len(self.parent))
+        return array("q", (self.find(x) for x in elements))
+
+    def union_all(self, pairs):
+        """ Unites the sets for every pair (x, y), returns the number of pairs that joined two different sets """
+        return sum(1 for x, y in pairs if self.union(x, y))
+
+
+def test():
+    """ Test for disjoint sets """
+    sets = DisjointSet(8)
+    print(sets.union_all([(0, 1), (2, 3), (1, 3), (4, 5), (0, 2)]))
+    print(sets.find_all(), sets.count)
+    print(sets.same_set(0, 3), sets.same_set(0, 4))
+
+# test()
@@ -0,0 +1,259 @@
+""" Dynamic graph algorithms, which update their results when the graph changes instead of recomputing them """
+
+import sys
+from graph_structs import Graph, Vertex
+from graph_traversal import topological_sort
+from heaps import IndexedMinHeap
+from shortest_one_to_all import dijkstra, DAG_shortest_paths
+
+
+class DynamicTopologicalOrder:
+    """
+        Topological order of a DAG that is updated when edges are added (the Pearce-Kelly algorithm).
+        An edge u -> v that already goes forward in the order needs no work. Otherwise only the vertices between
+        v and u in the order can be affected: the ones reachable from v and the ones reaching u are found with
+        two searches limited to that part of the order, and moved such that the first group comes after the second
+    """
+
+    def __init__(self, G):
+        """ Computes the initial order of G with topological sort, raises ValueError if G has a cycle """
+        self.G = G
+        # vertices[i] is the vertex at position i in the order, and position[v] is the position of v
+        self.vertices = topological_sort(G)
+        self.position = {v: i for i, v in enumerate(self.vertices)}
+        self.in_edges = {v: [] for v in G.V}
+        for u in G.V:
+            for v, weight in G.adj(u):
+                if self.position[v] <= self.position[u]:
+                    raise ValueError("Graph contains a cycle")
+                self.in_edges[v].append(u)
+
+    def order(self):
+        """ Returns the vertices in topological order """
+        return list(self.vertices)
+
+    def add_vertex(self, v):
+        """ Adds a new vertex (without edges) to the graph, last in the order """
+        self.G.add_vertex(v)
+        self.position[v] = len(self.vertices)
+        self.vertices.append(v)
+        self.in_edges[v] = []
+
+    def add_edge(self, u, v, weight=0):
+        """ Adds the edge u -> v to the graph and updates the order, raises ValueError if the edge would make a cycle """
+        if u == v:
+            raise ValueError("Edge would create a cycle")
+        lower = self.position[v]
+        upper = self.position[u]
+        if lower < upper:
+            # the vertices reachable from v with position at most upper, reaching u means that u -> v closes a cycle
+            forward = self._search(v, lambda w: [x for x, weight in self.G.adj(w)], lambda x: self.position[x] <= upper, u)
+            # the vertices reaching u with position at least lower
+            backward = self._search(u, lambda w: self.in_edges[w], lambda x: self.position[x] >= lower)
+            self._reorder(backward, forward)
+
+        u.add_edge(v, weight)
+        self.in_edges[v].append(u)
+
+    def _search(self, s, neighbors, inside, cycle_vertex=None):
+        """ DFS from s following neighbors(w) to the vertices where inside(x) is true, returns the vertices found """
+        found = {s}
+        stack = [s]
+        while stack:
+            w = stack.pop()
+            for x in neighbors(w):
+                if x == cycle_vertex:
+                    raise ValueError("Edge would create a cycle")
+                if x not in found and inside(x):
+                    found.add(x)
+                    stack.append(x)
+        return list(found)
+
+    def _reorder(self, backward, forward):
+        """ Gives the vertices in backward followed by the vertices in forward the positions they had together """
+        backward.sort(key=self.position.__getitem__)
+        forward.sort(key=self.position.__getitem__)
+        vertices = backward + forward
+        positions = sorted(self.position[w] for w in vertices)
+        for w, i in zip(vertices, positions):
+            self.position[w] = i
+            self.vertices[i] = w
+
+
+class DynamicShortestPaths:
+    """
+        Shortest path tree from s that is repaired when edges are inserted, deleted or get a new weight, instead of
+        running dijkstra again. The distances and parents are in self.state (a SearchState), like the result of dijkstra.
+        Works only with non-negative edges, on a Graph of Vertex objects (which is changed by the updates)
+    """
+
+    def __init__(self, G, s):
+        """ Computes the initial shortest path tree with dijkstra """
+        self.G = G
+        self.s = s
+        self.state = dijkstra(G, s)
+        # in_edges[v] lists (u, edge) for every edge u -> v, where edge is the [v, weight]-list in u.adj
+        self.in_edges = {v: [] for v in G.V}
+        for u in G.V:
+            for edge in G.adj(u):
+                self.in_edges[edge[0]].append((u, edge))
+
+    def _find_edge(self, u, v):
+        """ Returns the [v, weight]-list in u.adj for the edge u -> v """
+        for edge in self.G.adj(u):
+            if edge[0] == v:
+                return edge
+        raise ValueError("Edge not in graph")
+
+    def insert_edge(self, u, v, weight):
+        """ Adds the edge u -> v, and updates the distances that get shorter because of it """
+        if weight < 0:
+            raise ValueError("Edge weights must be non-negative")
+        u.add_edge(v, weight)
+        edge = u.adj[-1]
+        self.in_edges[v].append((u, edge))
+        self._decrease(u, v, weight)
+
+    def delete_edge(self, u, v):
+        """ Removes the edge u -> v, and repairs the subtree below v if the edge was in the shortest path tree """
+        edge = self._find_edge(u, v)
+        u.adj.remove(edge)
+        u.changed()
+        self.in_edges[v] = [(x, e) for x, e in self.in_edges[v] if e is not edge]
+        if self.state.p[v] == u:
+            self._repair(v)
+
+    def update_weight(self, u, v, weight):
+        """ Changes the weight of the edge u -> v, and updates the distances that change because of it """
+        if weight < 0:
+            raise ValueError("Edge weights must be non-negative")
+        edge = self._find_edge(u, v)
+        old_weight = edge[1]
+        edge[1] = weight
+        u.changed()
+        if weight < old_weight:
+            self._decrease(u, v, weight)
+        elif weight > old_weight and self.state.p[v] == u:
+            self._repair(v)
+
+    def _decrease(self, u, v, weight):
+        """ Dijkstra from v, starting when the edge u -> v gets shorter, that only visits vertices whose distance decreases """
+        d = self.state.d
+        p = self.state.p
+        if d[u] == sys.maxsize or d[u] + weight >= d[v]:
+            return
+        d[v] = d[u] + weight
+        p[v] = u
+        Q = IndexedMinHeap([(v, d[v])])
+        while Q.size() > 0:
+            x = Q.extract_min()
+            for y, w in self.G.adj(x):
+                if d[x] + w < d[y]:
+                    d[y] = d[x] + w
+                    p[y] = x
+                    if y in Q:
+                        Q.decrease_key(y, d[y])
+                    else:
+                        Q.insert(y, d[y])
+
+    def _repair(self, v):
+        """
+            Recomputes the distances in the subtree below v, when the tree edge into v got longer or was removed.
+            Only the vertices in the subtree can get longer distances, so they start with the best edge coming
+            from outside the subtree, and then dijkstra is run on the subtree
+        """
+        d = self.state.d
+        p = self.state.p
+
+        subtree = {v}
+        stack = [v]
+        while stack:
+            x = stack.pop()
+            for y, w in self.G.adj(x):
+                if y not in subtree and p[y] == x:
+                    subtree.add(y)
+                    stack.append(y)
+
+        Q = IndexedMinHeap()
+        for x in subtree:
+            d.pop(x, None)
+            p.pop(x, None)
+            for u, edge in self.in_edges[x]:
+                if u not in subtree and d[u] != sys.maxsize and d[u] + edge[1] < d[x]:
+                    d[x] = d[u] + edge[1]
+                    p[x] = u
+            if d[x] != sys.maxsize:
+                Q.insert(x, d[x])
+
+        while Q.size() > 0:
+            x = Q.extract_min()
+            for y, w in self.G.adj(x):
+                if y in subtree and d[x] + w < d[y]:
+                    d[y] = d[x] + w
+                    p[y] = x
+                    if y in Q:
+                        Q.decrease_key(y, d[y])
+                    else:
+                        Q.insert(y, d[y])
+
+
+def test1():
+    """ Test for dynamic topological order """
+
+    r = Vertex("r")
+    s = Vertex("s")
+    t = Vertex("t")
+    x = Vertex("x")
+    y = Vertex("y")
+    z = Vertex("z")
+
+    r.add_edge(s, 5)
+    s.add_edge(t, 2)
+    x.add_edge(y, -1)
+    y.add_edge(z, -2)
+
+    g = Graph(r, s, t, x, y, z)
+    order = DynamicTopologicalOrder(g)
+    print(order.order())
+    order.add_edge(t, x, 7)
+    print(order.order())
+    try:
+        order.add_edge(z, r, 1)
+    except ValueError as e:
+        print(e)
+
+    state = DAG_shortest_paths(g, s, order=order.order())
+    for v in g.V:
+        print(f"{v}: {state.d[v]}")
+
+# test1()
+
+
+def test2():
+    """ Test for dynamic shortest paths """
+    s = Vertex("s")
+    t = Vertex("t")
+    x = Vertex("x")
+    y = Vertex("y")
+    z = Vertex("z")
+
+    s.add_edge(t, 10)
+    s.add_edge(y, 5)
+    t.add_edge(x, 1)
+    t.add_edge(y, 2)
+    x.add_edge(z, 4)
+    y.add_edge(t, 3)
+    y.add_edge(x, 9)
+    y.add_edge(z, 2)
+    z.add_edge(s, 7)
+    z.add_edge(x, 6)
+
+    g = Graph(s, t, x, y, z)
+    paths = DynamicShortestPaths(g, s)
+    paths.update_weight(s, y, 20)
+    paths.insert_edge(s, x, 3)
+    paths.delete_edge(t, x)
+    for v in g.V:
+        print(f"{v}: {paths.state.d[v]}, parent {paths.state.p[v]}")
+
+# test2()
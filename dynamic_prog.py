@@ -1,6 +1,7 @@
 """ LCS and Rod Cutting implemented using dynamic programming (bottom up) """
 
 import sys
+import instrumentation
 
 
 def LCS(x, y):
@@ -28,6 +29,10 @@ def LCS(x, y):
                 else:
                     result[row][col][0] = result[row][col - 1][0]
                     result[row][col][1] = "l "
+    counts = instrumentation.counts()
+    if counts is not None:
+        counts["dp_cells"] += n * m
+
     # print sequence:
     for row in result:
         print(row)
@@ -81,6 +86,11 @@ def rod_cut(prices, length):
         # add the max value we can get for a rod of length i
         result[i] = max_val
 
+    counts = instrumentation.counts()
+    if counts is not None:
+        # one evaluation of a cut j for every rod i and every 1 <= j <= i
+        counts["dp_cells"] += n * (n + 1) // 2
+
     print("Optimal value for rods of size equal to index i: ", result)
     print("First cut to make at index i to construct an optimal solution:",
           cuts)
@@ -140,6 +150,10 @@ def binary_knapsack(items, W):
                 # compare max values given by including or excluding item i at weight j, and set K[i][j] as the max of these values
                 K[i][j] = max(x, y)
 
+    counts = instrumentation.counts()
+    if counts is not None:
+        counts["dp_cells"] += (n - 1) * (W + 1)
+
     # remove the first helper-row for the blank item before returning K
     # max value we can get is in the bottom-right-most cell
     return K[1:]
@@ -160,4 +174,4 @@ def test3():
     print(f"Max value: {K[len(items) - 1][max_weight]}")
 
 
-test3()
+# test3()
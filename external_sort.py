@@ -0,0 +1,180 @@
+""" External merge sort, for files of records that are too large to sort in memory """
+
+import heapq
+import os
+import struct
+import sys
+import tempfile
+from itertools import count, islice
+import instrumentation
+from sorting import adaptive_merge_sort
+
+
+class RecordFormat:
+    """
+        Fixed-size binary records described by a struct format, like "<q" for one integer or "<qd" for an integer and
+        a float. A record with one field is read as a value, records with more fields are read as tuples
+    """
+
+    def __init__(self, record_format="<q"):
+        self.struct = struct.Struct(record_format)
+        self.size = self.struct.size
+        self.fields = len(self.struct.unpack(bytes(self.size)))
+
+    def pack(self, records):
+        """ Returns the records as bytes """
+        pack = self.struct.pack
+        if self.fields == 1:
+            return b"".join([pack(record) for record in records])
+        return b"".join([pack(*record) for record in records])
+
+    def unpack(self, data):
+        """ Returns the records in data as a list """
+        if self.fields == 1:
+            return [record for record, in self.struct.iter_unpack(data)]
+        return list(self.struct.iter_unpack(data))
+
+
+def read_records(filename, record_format="<q", buffer_size=1024 * 1024):
+    """ Yields the records of a binary file, reading buffer_size bytes at a time """
+    if not isinstance(record_format, RecordFormat):
+        record_format = RecordFormat(record_format)
+    # reads a whole number of records every time
+    buffer_size = max(1, buffer_size // record_format.size) * record_format.size
+    with open(filename, "rb", buffering=0) as f:
+        while True:
+            data = f.read(buffer_size)
+            if not data:
+                break
+            if len(data) % record_format.size != 0:
+                raise ValueError("File does not contain a whole number of records")
+            yield from record_format.unpack(data)
+
+
+def write_records(filename, records, record_format="<q", buffer_size=1024 * 1024):
+    """ Writes the records to a binary file, buffer_size bytes at a time, and returns the number of records written """
+    if not isinstance(record_format, RecordFormat):
+        record_format = RecordFormat(record_format)
+    records = iter(records)
+    batch = max(1, buffer_size // record_format.size)
+    written = 0
+    with open(filename, "wb", buffering=0) as f:
+        while True:
+            chunk = list(islice(records, batch))
+            if not chunk:
+                break
+            f.write(record_format.pack(chunk))
+            written += len(chunk)
+    return written
+
+
+def merge_runs(runs, key=None):
+    """
+        Heap-based k-way merge of sorted iterables, yielding the records in sorted order. The heap holds the next record
+        of every run, and records with equal keys are taken from the earlier run first, so the merge is stable
+    """
+    heap = []
+    for index, run in enumerate(runs):
+        run = iter(run)
+        for record in run:
+            heap.append((record if key is None else key(record), index, record, run))
+            break
+    heapq.heapify(heap)
+    while heap:
+        k, index, record, run = heap[0]
+        yield record
+        for record in run:
+            heapq.heapreplace(heap, (record if key is None else key(record), index, record, run))
+            break
+        else:
+            heapq.heappop(heap)
+
+
+def _record_memory(record, key):
+    """ Estimates the memory of one record in a list being sorted, including its key """
+    size = sys.getsizeof(record) + 8
+    if isinstance(record, tuple):
+        size += sum(sys.getsizeof(field) for field in record)
+    if key is not None:
+        # the (key, index) pair made by adaptive_merge_sort
+        k = key(record)
+        size += sys.getsizeof((k, 0)) + sys.getsizeof(k) + sys.getsizeof(0) + 8
+    return size
+
+
+def external_sort(source, output, record_format="<q", key=None, memory=64 * 1024 * 1024, fan_in=16, temp_dir=None):
+    """
+        Sorts records that do not fit in memory, and writes them to the binary file output. source is a binary file
+        of records (see RecordFormat) or an iterable of records. Returns the number of records.\n
+        The records are read in chunks that fit in memory bytes, every chunk is sorted with adaptive_merge_sort and
+        written to a temporary run file in the same binary format, and the runs are merged fan_in at a time with
+        merge_runs (in several passes if there are more than fan_in runs), with a buffer of about memory / (fan_in + 1)
+        bytes for every file. The sort is stable, and with key the records are sorted by key(record)
+    """
+    if fan_in < 2:
+        raise ValueError("fan_in must be at least 2")
+    record_format = RecordFormat(record_format)
+    if isinstance(source, (str, os.PathLike)):
+        source = read_records(source, record_format, memory // (fan_in + 1))
+    records = iter(source)
+    buffer_size = max(record_format.size, memory // (fan_in + 1))
+    counts = instrumentation.counts()
+
+    with tempfile.TemporaryDirectory(dir=temp_dir) as directory:
+        numbers = count()
+
+        def run_file():
+            return os.path.join(directory, f"run{next(numbers)}.bin")
+
+        # sorted runs, each as large as fits in memory
+        runs = []
+        chunk_size = None
+        while True:
+            first = next(records, None)
+            if first is None:
+                break
+            if chunk_size is None:
+                chunk_size = max(1, memory // _record_memory(first, key))
+            chunk = [first]
+            chunk.extend(islice(records, chunk_size - 1))
+            adaptive_merge_sort(chunk, key=key)
+            runs.append(run_file())
+            write_records(runs[-1], chunk, record_format, buffer_size)
+            del chunk
+        if counts is not None:
+            counts["run_files"] += len(runs)
+
+        # merges fan_in runs at a time, until the rest can be merged directly to output
+        while len(runs) > fan_in:
+            merged = []
+            for start in range(0, len(runs), fan_in):
+                group = runs[start:start + fan_in]
+                if len(group) == 1:
+                    merged.append(group[0])
+                    continue
+                merged.append(run_file())
+                write_records(merged[-1], merge_runs([read_records(run, record_format, buffer_size) for run in group], key), record_format, buffer_size)
+                for run in group:
+                    os.remove(run)
+            runs = merged
+            if counts is not None:
+                counts["merge_passes"] += 1
+
+        total = write_records(output, merge_runs([read_records(run, record_format, buffer_size) for run in runs], key), record_format, buffer_size)
+        if counts is not None:
+            counts["merge_passes"] += 1
+    return total
+
+
+def test():
+    """ Test for external merge sort, with a memory budget that only fits a few records at a time """
+    import random
+
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "records.bin")
+        output = os.path.join(directory, "sorted.bin")
+        write_records(source, [(random.randint(0, 99), i) for i in range(50)], "<qq")
+        external_sort(source, output, "<qq", key=lambda record: record[0], memory=2000, fan_in=3)
+        print(list(read_records(output, "<qq")))
+
+# test()
@@ -0,0 +1,303 @@
+""" Reading and writing graphs: streaming edge lists, and binary graph files which are memory-mapped when loaded """
+
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from itertools import chain, islice
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from graph_structs import Graph, Vertex, CSRGraph
+
+
+# header: magic, byte order, weight typecode, kind of names (0 = none, 1 = integers, 2 = strings), number of vertices
+# and edges, padded to 64 bytes such that every section after it is aligned. The sections are offsets (n + 1 integers),
+# targets (m integers), weights (m integers or doubles), and then the names if there are any: n integers, or
+# n + 1 integer offsets into a block of utf-8 text
+MAGIC = b"CSRGRAPH"
+HEADER = struct.Struct("<8sccbxxxxxqq")
+HEADER_SIZE = 64
+
+NO_NAMES = 0
+INTEGER_NAMES = 1
+STRING_NAMES = 2
+
+
+class MappedNames:
+    """ Vertex names stored as utf-8 text in a graph file, a name is only decoded when it is used """
+
+    def __init__(self, offsets, text):
+        self.offsets = offsets
+        self.text = text
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return str(self.text[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    def release(self):
+        """ Releases the memoryviews of the file """
+        self.offsets.release()
+        self.text.release()
+
+
+def _typecode(values):
+    """ Returns the typecode of an array or memoryview, or 'q' / 'd' for a list of integers / other numbers """
+    if isinstance(values, array):
+        return values.typecode
+    if isinstance(values, memoryview):
+        return values.format
+    return "q" if all(isinstance(value, int) for value in values) else "d"
+
+
+def _to_bytes(values, typecode):
+    """ Returns the values as bytes in the given array typecode """
+    if not isinstance(values, (array, memoryview)) or _typecode(values) != typecode:
+        values = array(typecode, values)
+    return values.tobytes()
+
+
+def _to_array(typecode, values):
+    """ Converts a numpy array to an array.array with the given typecode """
+    result = array(typecode)
+    result.frombytes(values.tobytes())
+    return result
+
+
+def save_graph(G, filename):
+    """ Writes G (a Graph or CSRGraph) to a binary graph file """
+    if not isinstance(G, CSRGraph):
+        G = CSRGraph.from_graph(G)
+    weight_code = _typecode(G.weights)
+    if weight_code not in ("q", "d"):
+        weight_code = "d"
+
+    names = [G.names[i] for i in range(G.n)] if G.names is not None else None
+    if names is None or all(name is None for name in names):
+        names_kind = NO_NAMES
+    elif all(type(name) is int for name in names):
+        names_kind = INTEGER_NAMES
+    else:
+        names_kind = STRING_NAMES
+
+    with open(filename, "wb") as f:
+        header = HEADER.pack(
+            MAGIC,
+            b"<" if sys.byteorder == "little" else b">",
+            weight_code.encode(),
+            names_kind,
+            G.n,
+            G.m,
+        )
+        f.write(header.ljust(HEADER_SIZE, b"\0"))
+        f.write(_to_bytes(G.offsets, "q"))
+        f.write(_to_bytes(G.targets, "q"))
+        f.write(_to_bytes(G.weights, weight_code))
+        if names_kind == INTEGER_NAMES:
+            f.write(array("q", names).tobytes())
+        elif names_kind == STRING_NAMES:
+            encoded = [("" if name is None else str(name)).encode("utf-8") for name in names]
+            offsets = array("q", [0])
+            for name in encoded:
+                offsets.append(offsets[-1] + len(name))
+            f.write(offsets.tobytes())
+            f.write(b"".join(encoded))
+
+
+def load_graph(filename):
+    """
+        Memory-maps a binary graph file and returns it as a read-only CSRGraph. The offsets, targets and weights
+        are memoryviews of the file, so loading takes the same time for any size, and pages are read from disk when used.
+        The file stays open until graph.close() is called (or the graph is garbage collected)
+    """
+    with open(filename, "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, byteorder, weight_code, names_kind, n, m = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not a graph file")
+    if byteorder != (b"<" if sys.byteorder == "little" else b">"):
+        raise ValueError("Graph file was written with a different byte order")
+    weight_code = weight_code.decode()
+
+    view = memoryview(data)
+    position = HEADER_SIZE
+
+    def section(typecode, length):
+        nonlocal position
+        start = position
+        position += 8 * length if typecode != "B" else length
+        return view[start:position].cast(typecode)
+
+    offsets = section("q", n + 1)
+    targets = section("q", m)
+    weights = section(weight_code, m)
+    names = None
+    if names_kind == INTEGER_NAMES:
+        names = section("q", n)
+    elif names_kind == STRING_NAMES:
+        name_offsets = section("q", n + 1)
+        names = MappedNames(name_offsets, section("B", name_offsets[n]))
+
+    view.release()
+    graph = CSRGraph.from_arrays(offsets, targets, weights, names=names)
+    # keeps the memory map open until the graph is closed
+    graph.mapped_file = data
+    return graph
+
+
+def read_edge_list(filename, delimiter=None, weight_type=int, default_weight=0):
+    """
+        Yields the edges (u, v, weight) of a text file with one edge per line, like "u v weight" or "u,v,weight"
+        (the weight is optional). Empty lines and lines starting with # are skipped, and the file is read one line at a time
+    """
+    with open(filename) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            fields = line.split(delimiter)
+            if len(fields) == 2:
+                yield fields[0].strip(), fields[1].strip(), default_weight
+            else:
+                yield fields[0].strip(), fields[1].strip(), weight_type(fields[2])
+
+
+class GraphBuilder:
+    """
+        Builds a CSRGraph in one pass over a stream of edges (u, v, weight), where u and v can be any hashable names.
+        Every new name gets the next integer id, and the edges are stored in arrays (24 bytes per edge) instead
+        of Vertex objects and adjacency lists.\n
+        With deduplicate, duplicate edges u -> v are removed by build, keeping the first weight. They are found by
+        sorting the edges by (u, v), which only needs memory while the graph is built: about 40 bytes per edge
+        with numpy, and a list of (u, v) keys and a list of indexes (about 180 bytes per edge) without it
+    """
+
+    def __init__(self, deduplicate=True):
+        self.ids = {}
+        self.names = []
+        self.sources = array("q")
+        self.targets = array("q")
+        self.weights = array("q")
+        self.deduplicate = deduplicate
+
+    def id(self, name):
+        """ Returns the id of the vertex name, adding it if it is new """
+        i = self.ids.get(name)
+        if i is None:
+            i = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return i
+
+    def add_edge(self, u, v, weight=0):
+        """ Adds the edge u -> v """
+        self.sources.append(self.id(u))
+        self.targets.append(self.id(v))
+        self._extend_weights((weight,))
+
+    def _extend_weights(self, weights):
+        """ Appends the weights, switching to floats when the first non-integer weight arrives """
+        if self.weights.typecode == "q" and not all(isinstance(weight, int) for weight in weights):
+            self.weights = array("d", self.weights)
+        self.weights.extend(weights)
+
+    def add_edges(self, edges, chunk_size=100000):
+        """
+            Adds the edges from an iterable of (u, v, weight), reading it chunk_size edges at a time, such that at most
+            one chunk is held as Python objects. Every chunk is added to the arrays with a few bulk operations
+        """
+        edges = iter(edges)
+        while True:
+            chunk = list(islice(edges, chunk_size))
+            if not chunk:
+                break
+            us, vs, weights = zip(*chunk)
+            del chunk
+            # the names as u0, v0, u1, v1, ..., such that new names get their ids in the order of the edges
+            names = list(chain.from_iterable(zip(us, vs)))
+            ids = list(map(self.ids.get, names))
+            if None in ids:
+                ids = [self.id(name) if i is None else i for name, i in zip(names, ids)]
+            ids = array("q", ids)
+            self.sources.extend(ids[0::2])
+            self.targets.extend(ids[1::2])
+            self._extend_weights(weights)
+        return self
+
+    def _unique_edges(self):
+        """ Returns the sources, targets and weights without duplicate edges, keeping the first of every edge u -> v """
+        m = len(self.sources)
+        if np is not None:
+            sources = np.frombuffer(self.sources, dtype=np.int64)
+            targets = np.frombuffer(self.targets, dtype=np.int64)
+            weights = np.frombuffer(self.weights, dtype=np.int64 if self.weights.typecode == "q" else np.float64)
+            # lexsort is stable, so the first edge of every run of equal (u, v) is the one added first
+            order = np.lexsort((targets, sources))
+            first = np.ones(m, dtype=bool)
+            first[1:] = (sources[order[1:]] != sources[order[:-1]]) | (targets[order[1:]] != targets[order[:-1]])
+            keep = np.sort(order[first])
+            return (
+                _to_array("q", sources[keep]),
+                _to_array("q", targets[keep]),
+                _to_array(self.weights.typecode, weights[keep]),
+            )
+
+        keys = list(zip(self.sources, self.targets))
+        # sorted is stable, so the first edge of every run of equal keys is the one added first
+        order = sorted(range(m), key=keys.__getitem__)
+        keep = [i for j, i in enumerate(order) if j == 0 or keys[i] != keys[order[j - 1]]]
+        del keys, order
+        keep.sort()
+        return tuple(array(values.typecode, (values[i] for i in keep)) for values in (self.sources, self.targets, self.weights))
+
+    def build(self):
+        """ Returns the CSRGraph of the edges added so far, where G.V[i] is the vertex with id i and name names[i] """
+        if self.deduplicate:
+            sources, targets, weights = self._unique_edges()
+        else:
+            sources, targets, weights = self.sources, self.targets, self.weights
+        return CSRGraph.from_edge_arrays(len(self.names), sources, targets, weights, names=self.names)
+
+
+def load_edge_list(filename, delimiter=None, weight_type=int, deduplicate=True):
+    """ Builds a CSRGraph from a text file with one edge per line, see read_edge_list """
+    return GraphBuilder(deduplicate).add_edges(read_edge_list(filename, delimiter, weight_type)).build()
+
+
+def test():
+    """ Test for saving and loading a graph file """
+    s = Vertex("s")
+    t = Vertex("t")
+    x = Vertex("x")
+
+    s.add_edge(t, 10)
+    s.add_edge(x, 5)
+    t.add_edge(x, 1)
+    x.add_edge(s, 7)
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "graph.bin")
+        save_graph(Graph(s, t, x), filename)
+        g = load_graph(filename)
+        g.print()
+        g.to_graph().print()
+        # the memory map must be closed before the file can be removed on some systems
+        g.close()
+
+# test()
+
+
+def test2():
+    """ Test for building a graph from a stream of edges """
+    edges = [("a", "b", 4), ("a", "c", 1), ("c", "b", 2), ("a", "b", 3)]
+    g = GraphBuilder().add_edges(edges).build()
+    g.print()
+
+# test2()
@@ -1,5 +1,14 @@
 """ Vertex and Graph """
 
+import sys
+import weakref
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 
 class Vertex:
     """ Class for generic vertex to be used in graph algorithms """
@@ -20,8 +29,21 @@ class Vertex:
 
     def add_edge(self, vertex, weight=0):
         """ Add a directed edge from self to vertex and saves it in self.adj, listed with weight """
-        if not vertex in self.adj:
-            self.adj.append([vertex, weight])
+        self.adj.append([vertex, weight])
+        self.changed()
+
+    def changed(self):
+        """ Marks the graphs containing the vertex as changed, must be called after editing self.adj directly """
+        graphs = _graphs.get(self)
+        if graphs is None:
+            return
+        if isinstance(graphs, weakref.WeakSet):
+            for graph in graphs:
+                graph.version += 1
+        else:
+            graph = graphs()
+            if graph is not None:
+                graph.version += 1
 
     def __lt__(self, other):
         """ Makes it possible to compare vertices by their ranks/value or d """
@@ -43,25 +65,66 @@ class Graph:
 
     def __init__(self, *vertices):
         """
-            Initalizes with an optional number of vertices, and adds all vertex-edges as tuples to a list.
-            These tuples contains the weight of the edge if present.
+            Initalizes with an optional number of vertices. The edges are read from the adjacency lists of the
+            vertices, such that the graph always has the current edges if they are changed later
         """
         self.V = [v for v in vertices]
-        self.E = []
+        # set of the vertices, such that adj can check membership in O(1)
+        self.vertex_set = set(self.V)
+        # increased every time an edge of the graph changes, such that results computed for an older version can be detected
+        self.version = 0
+        for v in self.V:
+            _add_graph(v, self)
+        # the edge list is built the first time E is read, and kept until the version changes
+        self._E = None
+        self._E_version = None
+
+    def add_vertex(self, vertex):
+        """ Adds a vertex to the graph """
+        self.V.append(vertex)
+        self.vertex_set.add(vertex)
+        _add_graph(vertex, self)
+        self.version += 1
+
+    def __setstate__(self, state):
+        """ Registers the graph on its vertices again when it is unpickled or copied, since copies get new vertices """
+        self.__dict__.update(state)
+        for v in self.V:
+            _add_graph(v, self)
+
+    @property
+    def E(self):
+        """
+            Returns all vertex-edges as tuples in a list.
+            These tuples contains the weight of the edge if present.
+            The list is only built again when an edge of the graph has changed (when the version is increased)
+        """
+        if self._E is not None and self._E_version == self.version:
+            return self._E
+        E = []
         for u in self.V:
             for v in u.adj:
                 if len(v) == 2:
                     # len == 2 --> edge is weighted
                     # edge format: (u, v, weight)
-                    self.E.append((u, v[0], v[1]))
+                    E.append((u, v[0], v[1]))
                 else:
                     # edge not weighted
                     # edge format: (u, v)
-                    self.E.append((u, v))
+                    E.append((u, v))
+        self._E = E
+        self._E_version = self.version
+        return E
+
+    @E.setter
+    def E(self, E):
+        """ Sets the list of edges, which is used until an edge of the graph changes """
+        self._E = E
+        self._E_version = self.version
 
     def adj(self, vertex):
         """ Returns the adjacency list for a gived vertex in the graph """
-        if vertex in self.V:
+        if vertex in self.vertex_set:
             return vertex.adj
         else:
             raise ValueError("Vertex not in graph")
@@ -75,7 +138,407 @@ class Graph:
         print()
 
 
+# the graphs containing each vertex, whose version is increased when an edge is added to the vertex. It is kept
+# outside the vertices such that they can be pickled and copied, and holds the vertices and graphs weakly such
+# that they are removed when they are deleted. A vertex in one graph maps to a weak reference to it (the common case,
+# which takes the least memory), and a vertex in more graphs to a WeakSet of them
+_graphs = weakref.WeakKeyDictionary()
+
+
+def _add_graph(vertex, graph):
+    """ Registers that vertex is in graph, other vertex types (like CSRVertex) can not get new edges and are skipped """
+    if not isinstance(vertex, Vertex):
+        return
+    graphs = _graphs.get(vertex)
+    if isinstance(graphs, weakref.WeakSet):
+        graphs.add(graph)
+    elif graphs is None or graphs() is None or graphs() is graph:
+        _graphs[vertex] = weakref.ref(graph)
+    else:
+        _graphs[vertex] = weakref.WeakSet((graphs(), graph))
+
+
+class StateMap(dict):
+    """ Dict that returns a default value for missing keys, without storing it """
+
+    def __init__(self, default=None):
+        super().__init__()
+        self.default = default
+
+    def __missing__(self, key):
+        return self.default
+
+
+class SearchState:
+    """
+        Working state of one search on a graph, kept apart from the vertices such that many searches can run on
+        the same graph at the same time. Each attribute maps a vertex to its value (like v.d or v.p in Vertex),
+        vertices that are not touched by the search get a default value and take no space
+    """
+
+    def __init__(self):
+        self.color = StateMap("white")
+        self.d = StateMap(sys.maxsize)
+        self.f = StateMap()
+        self.p = StateMap()
+        self.key = StateMap(sys.maxsize)
+        self.rank = StateMap(0)
+
+    def reset(self):
+        """ Resets the state for a new search, in time proportional to the number of touched vertices """
+        for values in (self.color, self.d, self.f, self.p, self.key, self.rank):
+            values.clear()
+
+
+class CSRVertex:
+    """
+        Lightweight view of a vertex in a CSRGraph, identified by its integer id.
+        Has the same search attributes as Vertex, but no per-vertex adjacency list
+    """
+
+    __slots__ = ("graph", "id", "color", "d", "f", "p", "rank", "name", "comparator")
+
+    def __init__(self, graph, id, name=None, rank=None, comparator="rank"):
+        self.graph = graph
+        self.id = id
+        self.color = None
+        self.d = None
+        self.f = None
+        self.p = None
+        self.name = name
+        self.rank = rank
+        self.comparator = comparator
+
+    @property
+    def adj(self):
+        """ Adjacency list of the vertex, read from the arrays of its graph """
+        return self.graph.adj(self)
+
+    def __lt__(self, other):
+        """ Makes it possible to compare vertices by their ranks/value or d """
+        if self.comparator == "d":
+            return self.d < other.d
+        else:
+            return self.rank < other.rank
+
+    def __repr__(self):
+        """ Makes debugging easier """
+        if self.name:
+            return str(self.name)
+        else:
+            return f"Vertex {self.id}"
+
+
+class CSREdge:
+    """
+        An edge u -> v in a CSRGraph, behaves like the [vertex, weight]-lists in Vertex.adj.
+        Setting edge[1] writes the new weight back to the graph
+    """
+
+    __slots__ = ("graph", "index")
+
+    def __init__(self, graph, index):
+        self.graph = graph
+        self.index = index
+
+    def __getitem__(self, i):
+        if i == 0:
+            return self.graph.V[self.graph.targets[self.index]]
+        elif i == 1:
+            return self.graph.weights[self.index]
+        raise IndexError("Edge index out of range")
+
+    def __setitem__(self, i, value):
+        if i != 1:
+            raise IndexError("Only the weight of an edge can be changed")
+        self.graph.weights[self.index] = value
+        self.graph.version += 1
+
+    def __len__(self):
+        return 2
+
+    def __iter__(self):
+        yield self[0]
+        yield self[1]
+
+    def __repr__(self):
+        return f"[{self[0]}, {self[1]}]"
+
+
+class CSRAdjacency:
+    """
+        Adjacency list of a vertex in a CSRGraph, a view of the range of its edges in the arrays of the graph.
+        Iterating gives the pairs (vertex, weight), and adj[i] is the CSREdge of the i-th edge, which can change its weight
+    """
+
+    __slots__ = ("graph", "start", "end")
+
+    def __init__(self, graph, start, end):
+        self.graph = graph
+        self.start = start
+        self.end = end
+
+    def __len__(self):
+        return self.end - self.start
+
+    def __iter__(self):
+        V = self.graph.V
+        targets = self.graph.targets
+        weights = self.graph.weights
+        for i in range(self.start, self.end):
+            yield V[targets[i]], weights[i]
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("Edge index out of range")
+        return CSREdge(self.graph, self.start + i)
+
+    def __repr__(self):
+        return "[" + ", ".join(repr(self[i]) for i in range(len(self))) + "]"
+
+
+class CSRVertexList:
+    """
+        The vertices of a CSRGraph, used as G.V. A vertex view is made the first time it is used and then
+        reused, so only the vertices an algorithm touches become Python objects. Every vertex id has exactly one
+        view, also when several threads use the graph, since the searches key their state by the view
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.views = {}
+
+    def __len__(self):
+        return self.graph.n
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self.graph.n))]
+        if i < 0:
+            i += self.graph.n
+        if not 0 <= i < self.graph.n:
+            raise IndexError("Vertex id out of range")
+        view = self.views.get(i)
+        if view is None:
+            graph = self.graph
+            view = CSRVertex(
+                graph,
+                i,
+                name=graph.names[i] if graph.names is not None else None,
+                rank=graph.ranks[i] if graph.ranks is not None else i,
+                comparator=graph.comparator,
+            )
+            # another thread may have made a view of i at the same time, then all threads use the one stored first
+            view = self.views.setdefault(i, view)
+        return view
+
+    def __iter__(self):
+        for i in range(self.graph.n):
+            yield self[i]
+
+    def __contains__(self, vertex):
+        return isinstance(vertex, CSRVertex) and vertex.graph is self.graph
+
+    def index(self, vertex):
+        """ Returns the position of vertex in G.V, which is its id """
+        if vertex not in self:
+            raise ValueError("Vertex not in graph")
+        return vertex.id
+
+
+class CSRGraph:
+    """
+        Graph stored in compressed sparse row format. Vertices are the integers 0 ... n - 1, and the edges
+        going out of vertex u are targets[offsets[u] ... offsets[u + 1] - 1] with the same indexes in weights.
+        G.V, G.adj(u) and G.E work like in Graph, so the algorithms can run on both graph types
+    """
+
+    def __init__(self, n, edges=(), names=None, ranks=None, comparator="rank"):
+        """
+            Builds a graph with n vertices from an iterable of edges (u, v, weight), where u and v are vertex ids.
+            Names and ranks are optional lists indexed by vertex id, the rank of a vertex defaults to its id
+        """
+        sources = array("q")
+        targets = array("q")
+        weights = []
+        for u, v, weight in edges:
+            if not (0 <= u < n and 0 <= v < n):
+                raise ValueError("Vertex not in graph")
+            sources.append(u)
+            targets.append(v)
+            weights.append(weight)
+
+        # integer weights are stored exactly, any other weights as floats
+        typecode = "q" if all(isinstance(w, int) for w in weights) else "d"
+        self._sort_edges(n, sources, targets, array(typecode, weights))
+        self._set_vertices(names, ranks, comparator)
+
+    @classmethod
+    def from_edge_arrays(cls, n, sources, targets, weights, names=None, ranks=None, comparator="rank"):
+        """ Builds a graph with n vertices from the edges sources[i] -> targets[i] with weight weights[i], given as arrays """
+        graph = cls.__new__(cls)
+        graph._sort_edges(n, sources, targets, weights)
+        graph._set_vertices(names, ranks, comparator)
+        return graph
+
+    def _sort_edges(self, n, sources, targets, weights):
+        """ Stores the edges in compressed sparse row format, weights is an array with typecode 'q' or 'd' """
+        if np is not None:
+            # stable sort of the edges by source vertex, such that offsets[u] is the index of the first edge out of u
+            sources = np.asarray(sources, dtype=np.int64)
+            order = np.argsort(sources, kind="stable")
+            offsets = np.zeros(n + 1, dtype=np.int64)
+            np.cumsum(np.bincount(sources, minlength=n), out=offsets[1:])
+            self.offsets = array("q", offsets.tobytes())
+            self.targets = array("q", np.asarray(targets, dtype=np.int64)[order].tobytes())
+            dtype = np.int64 if weights.typecode == "q" else np.float64
+            self.weights = array(weights.typecode, np.asarray(weights, dtype=dtype)[order].tobytes())
+            return
+
+        # counting sort of the edges by source vertex, such that offsets[u] is the index of the first edge out of u
+        self.offsets = array("q", [0]) * (n + 1)
+        for u in sources:
+            self.offsets[u + 1] += 1
+        for u in range(n):
+            self.offsets[u + 1] += self.offsets[u]
+
+        self.targets = array("q", [0]) * len(sources)
+        self.weights = array(weights.typecode, [0]) * len(sources)
+        position = array("q", self.offsets[:-1])
+        for i in range(len(sources)):
+            u = sources[i]
+            self.targets[position[u]] = targets[i]
+            self.weights[position[u]] = weights[i]
+            position[u] += 1
+
+    @classmethod
+    def from_arrays(cls, offsets, targets, weights, names=None, ranks=None, comparator="rank"):
+        """
+            Makes a CSRGraph that uses the given offsets, targets and weights directly, without copying them.
+            They can be arrays, lists or memoryviews (for example of a memory-mapped file)
+        """
+        graph = cls.__new__(cls)
+        graph.offsets = offsets
+        graph.targets = targets
+        graph.weights = weights
+        graph._set_vertices(names, ranks, comparator)
+        return graph
+
+    def _set_vertices(self, names, ranks, comparator):
+        """ Sets up the vertex views, which are only made when they are first used """
+        self.n = len(self.offsets) - 1
+        self.m = len(self.targets)
+        self.names = names
+        self.ranks = ranks
+        self.comparator = comparator
+        self.V = CSRVertexList(self)
+        # increased when a weight is changed through an edge, like Graph.version
+        self.version = 0
+        # the memory map the arrays are views of, if the graph was loaded from a file (see graph_io.load_graph)
+        self.mapped_file = None
+
+    @classmethod
+    def from_graph(cls, G):
+        """ Converts a Graph (of Vertex objects) to a CSRGraph, where vertex G.V[i] gets id i """
+        ids = {u: i for i, u in enumerate(G.V)}
+        return cls(
+            len(G.V),
+            ((ids[u], ids[edge[0]], edge[1] if len(edge) == 2 else 0) for u in G.V for edge in u.adj),
+            names=[u.name for u in G.V],
+            ranks=[u.rank if u.rank is not None else i for i, u in enumerate(G.V)],
+            comparator=G.V[0].comparator if G.V else "rank",
+        )
+
+    def to_graph(self):
+        """ Converts the CSRGraph back to a Graph of Vertex objects """
+        vertices = [Vertex(v.name, v.rank, comparator=v.comparator) for v in self.V]
+        for u in range(self.n):
+            for i in range(self.offsets[u], self.offsets[u + 1]):
+                vertices[u].adj.append([vertices[self.targets[i]], self.weights[i]])
+        return Graph(*vertices)
+
+    def close(self):
+        """
+            Releases the arrays if they are memoryviews and closes the memory-mapped file of the graph, if any.
+            The graph can not be used after it is closed
+        """
+        for values in (self.offsets, self.targets, self.weights, self.names, self.ranks):
+            if hasattr(values, "release"):
+                values.release()
+        if self.mapped_file is not None:
+            self.mapped_file.close()
+            self.mapped_file = None
+
+    def neighbors(self, u):
+        """ Returns the pairs (v, weight) for all edges out of vertex id u """
+        start, end = self.offsets[u], self.offsets[u + 1]
+        return zip(self.targets[start:end], self.weights[start:end])
+
+    def adj(self, vertex):
+        """ Returns the adjacency list for a gived vertex in the graph, as a CSRAdjacency view of the arrays """
+        if not isinstance(vertex, CSRVertex) or vertex.graph is not self:
+            raise ValueError("Vertex not in graph")
+        return CSRAdjacency(self, self.offsets[vertex.id], self.offsets[vertex.id + 1])
+
+    @property
+    def E(self):
+        """ Iterates over all edges as tuples (u, v, weight), without storing them """
+        V = self.V
+        for u in range(self.n):
+            for i in range(self.offsets[u], self.offsets[u + 1]):
+                yield (V[u], V[self.targets[i]], self.weights[i])
+
+    def print(self):
+        """ Prints every vertex in the graph with its edges (and possible weights) in a readable format """
+        print("Graph:")
+        print("Edges: " + str(list(self.E)))
+        for v in self.V:
+            print(f"{v} -> {v.adj}")
+        print()
+
+
 v1 = Vertex(1, 9)
 v2 = Vertex(2, 3)
 
 #print(v1 > v2)
+
+
+def test():
+    """ Test for converting a Graph to a CSRGraph and back """
+    v1 = Vertex(1)
+    v2 = Vertex(2)
+    v3 = Vertex(3)
+
+    v1.add_edge(v2, 4)
+    v1.add_edge(v3, 1)
+    v3.add_edge(v2, 2)
+
+    g = CSRGraph.from_graph(Graph(v1, v2, v3))
+    g.print()
+    g.to_graph().print()
+    CSRGraph.from_graph(Graph()).print()
+
+# test()
+
+
+def test2():
+    """ Test for pickling and copying a graph, where the copy gets its own version """
+    import copy
+    import pickle
+
+    v1 = Vertex(1)
+    v2 = Vertex(2)
+    v1.add_edge(v2, 4)
+    g = Graph(v1, v2)
+
+    g_pickled = pickle.loads(pickle.dumps(g))
+    g_copy = copy.deepcopy(g)
+    g_copy.V[1].add_edge(g_copy.V[0], 1)
+    g_pickled.V[1].add_edge(g_pickled.V[0], 2)
+    g_pickled.V[1].add_edge(g_pickled.V[0], 3)
+    print(g.version, g_copy.version, g_pickled.version)
+    print(g.E, g_copy.E, g_pickled.E)
+
+# test2()
@@ -1,79 +1,223 @@
 """ BFS, DFS and Topological sort """
 
 import sys
-from queue import Queue, LifoQueue
-from graph_structs import Vertex, Graph
-
-
-def BFS(G, s):
-    """ Implementation of Breadth First Search """
-    for u in G.V:
-        u.color = "white"
-        u.d = sys.maxsize
-        u.p = None
-    s.color = "gray"
-    s.d = 0
-    Q = Queue()
-    Q.put(s)
-    while not Q.empty():
-        u = Q.get()
-        print(f"searching {u}")
-        for v, weight in G.adj(u):
-            if v.color == "white":
-                v.color = "grey"
-                v.d = u.d + 1
-                v.p = u
-                Q.put(v)
-                print(f"found {v}, distance from {s} is {v.d}")
-        print(f"finished {u}")
-
-
-global time
+from collections import deque
+import instrumentation
+from graph_structs import Vertex, Graph, SearchState
 
 
-def DFS(G, debug=True):
-    """ Implements Depth First Search """
-    global time
-    for u in G.V:
-        u.color = "white"
-        u.p = None
+def print_trace(event, u, s, d=None):
+    """ Trace hook for BFS which prints every step of the search """
+    if event == "found":
+        print(f"found {u}, distance from {s} is {d}")
+    else:
+        print(f"{event} {u}")
+
+
+def BFS(G, s, trace=None):
+    """
+        Implementation of Breadth First Search, returns the colors, distances and parents as a SearchState.\n
+        If trace is given (for example print_trace), it is called as trace(event, u, s, d) when a vertex u is
+        searching, found or finished
+    """
+    counts = instrumentation.counts()
+    state = SearchState()
+    state.color[s] = "gray"
+    state.d[s] = 0
+    Q = deque([s])
+    while Q:
+        u = Q.popleft()
+        if trace:
+            trace("searching", u, s)
+        edges = G.adj(u)
+        if counts is not None:
+            counts["vertices_visited"] += 1
+            counts["edges_scanned"] += len(edges)
+        for v, weight in edges:
+            if state.color[v] == "white":
+                state.color[v] = "grey"
+                state.d[v] = state.d[u] + 1
+                state.p[v] = u
+                Q.append(v)
+                if trace:
+                    trace("found", v, s, state.d[v])
+        if trace:
+            trace("finished", u, s)
+    return state
+
+
+def adjacency_lists(G):
+    """
+        Returns the adjacency lists of G with vertex indexes instead of vertices, both for the edges going out of
+        every vertex and for the edges coming in, where index i is the vertex G.V[i]
+    """
+    index = {v: i for i, v in enumerate(G.V)}
+    out_edges = [[index[v] for v, weight in G.adj(u)] for u in G.V]
+    in_edges = [[] for _ in G.V]
+    for u, edges in enumerate(out_edges):
+        for v in edges:
+            in_edges[v].append(u)
+    return out_edges, in_edges
+
+
+def breadth_first_search(G, sources, adjacency=None, alpha=14, beta=24):
+    """
+        Direction-optimizing Breadth First Search from one or more sources at the same time. Every vertex gets
+        the distance to its nearest source, and the result is returned as lists indexed by the position of a
+        vertex in G.V: d[i] is the distance to G.V[i] (sys.maxsize if not reached), p[i] is the index of its parent (or None).\n
+        Each level is expanded either top-down (following the edges out of the frontier) or bottom-up (letting
+        every unvisited vertex look for a parent in the frontier), whichever checks fewer edges. It switches to
+        bottom-up when the frontier has more than 1/alpha of the unexplored edges, and back when the frontier
+        has less than 1/beta of the vertices.\n
+        adjacency is the result of adjacency_lists(G), which can be given to avoid recomputing it for every search
+    """
+    if adjacency is None:
+        adjacency = adjacency_lists(G)
+    out_edges, in_edges = adjacency
+    index = {v: i for i, v in enumerate(G.V)}
+    n = len(G.V)
+    d = [sys.maxsize] * n
+    p = [None] * n
+
+    frontier = []
+    for s in sources:
+        s = index[s]
+        if d[s] != 0:
+            d[s] = 0
+            frontier.append(s)
+
+    # number of edges going out of vertices that are not visited yet
+    unexplored_edges = sum(len(edges) for edges in out_edges) - sum(len(out_edges[u]) for u in frontier)
+    unvisited = None
+    bottom_up = False
+    level = 0
+
+    counts = instrumentation.counts()
+    while frontier:
+        frontier_edges = sum(len(out_edges[u]) for u in frontier)
+        if not bottom_up and frontier_edges > unexplored_edges / alpha:
+            bottom_up = True
+        elif bottom_up and len(frontier) < n / beta:
+            bottom_up = False
+        if counts is not None:
+            counts["vertices_visited"] += len(frontier)
+            counts["bottom_up_levels" if bottom_up else "top_down_levels"] += 1
+            if not bottom_up:
+                counts["edges_scanned"] += frontier_edges
+
+        next_frontier = []
+        if bottom_up:
+            in_frontier = bytearray(n)
+            for u in frontier:
+                in_frontier[u] = 1
+            if unvisited is None:
+                unvisited = [v for v in range(n) if d[v] == sys.maxsize]
+            remaining = []
+            for v in unvisited:
+                if d[v] != sys.maxsize:
+                    continue
+                for u in in_edges[v]:
+                    if in_frontier[u]:
+                        d[v] = level + 1
+                        p[v] = u
+                        next_frontier.append(v)
+                        break
+                else:
+                    remaining.append(v)
+            unvisited = remaining
+        else:
+            for u in frontier:
+                for v in out_edges[u]:
+                    if d[v] == sys.maxsize:
+                        d[v] = level + 1
+                        p[v] = u
+                        next_frontier.append(v)
+
+        unexplored_edges -= sum(len(out_edges[v]) for v in next_frontier)
+        frontier = next_frontier
+        level += 1
+
+    return d, p
+
+
+def depth_first_search(G, debug=False):
+    """
+        Implements Depth First Search with an explicit stack instead of recursion, so deep graphs do not
+        hit the recursion limit. The vertices are not changed, the result is returned as arrays indexed by
+        the position of a vertex in G.V:\n
+        d[i] and f[i] are the discovery and finish times of G.V[i], p[i] is the index of its parent (or None),
+        and finished lists the indexes in the order the vertices were finished
+    """
+    index = {v: i for i, v in enumerate(G.V)}
+    n = len(G.V)
+    d = [None] * n
+    f = [None] * n
+    p = [None] * n
+    finished = []
     time = 0
-    for u in G.V:
-        if u.color == "white":
-            if debug:
-                print(f"found {u} at time {time}")
-            DFS_vist(G, u, debug=debug)
-
-
-def DFS_vist(G, u, debug=True):
-    """ Sub-routine in DFS """
-    if debug:
-        print(f"searching {u}")
-    global time
-    time += 1
-    u.d = time
-    u.color = "grey"
-    for v, weigth in G.adj(u):
-        if v.color == "white":
-            if debug:
-                print(f"found {v} at time {time}")
-            v.p = u
-            DFS_vist(G, v, debug=debug)
-    u.color = "black"
-    time += 1
-    u.f = time
-    if debug:
-        print(f"finished {u} at time {time}")
+
+    for s in range(n):
+        if d[s] is not None:
+            continue
+        if debug:
+            print(f"found {G.V[s]} at time {time}")
+        # each stack element is a vertex index and an iterator over the rest of its adjacency list
+        time += 1
+        d[s] = time
+        if debug:
+            print(f"searching {G.V[s]}")
+        stack = [(s, iter(G.adj(G.V[s])))]
+        while stack:
+            u, edges = stack[-1]
+            for v, weight in edges:
+                v = index[v]
+                if d[v] is None:
+                    if debug:
+                        print(f"found {G.V[v]} at time {time}")
+                    p[v] = u
+                    time += 1
+                    d[v] = time
+                    if debug:
+                        print(f"searching {G.V[v]}")
+                    stack.append((v, iter(G.adj(G.V[v]))))
+                    break
+            else:
+                # all edges out of u are explored
+                stack.pop()
+                time += 1
+                f[u] = time
+                finished.append(u)
+                if debug:
+                    print(f"finished {G.V[u]} at time {time}")
+
+    counts = instrumentation.counts()
+    if counts is not None:
+        # every vertex is visited and every edge is scanned exactly once
+        counts["vertices_visited"] += n
+        counts["edges_scanned"] += sum(len(G.adj(u)) for u in G.V)
+
+    return d, f, p, finished
+
+
+def DFS(G, debug=True):
+    """
+        Implements Depth First Search, returns the discovery times, finish times and parents as a SearchState.
+        The vertices are not changed: d, f, p and color are read from the returned state (state.d[v] instead of v.d)
+    """
+    d, f, p, finished = depth_first_search(G, debug=debug)
+    state = SearchState()
+    for i, u in enumerate(G.V):
+        state.color[u] = "black"
+        state.d[u] = d[i]
+        state.f[u] = f[i]
+        state.p[u] = G.V[p[i]] if p[i] is not None else None
+    return state
 
 
 def topological_sort(G):
-    """ Implementation of Toplogical Sort using DFS """
-    DFS(G, debug=False)
-    result = []
-    for u in G.V:
-        result.append(u)
-    result.sort(key=lambda x: x.f, reverse=True)
-    return result
+    """ Implementation of Toplogical Sort using DFS, the vertices are returned in reverse order of finishing """
+    d, f, p, finished = depth_first_search(G)
+    return [G.V[i] for i in reversed(finished)]
 
 
 def test():
@@ -96,10 +240,12 @@ def test():
     g.print()
     print(g.E)
     print("BFS:")
-    BFS(g, v1)
+    BFS(g, v1, trace=print_trace)
+    print("Multi-source BFS from 1 and 6:")
+    print(breadth_first_search(g, [v1, v6]))
     print("\nDFS:")
     DFS(g)
     print("\nTopological sort:")
     print(topological_sort(g))
 
-test()
+# test()
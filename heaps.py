@@ -1,5 +1,7 @@
 """ Heap algorithms for implementing a min-heap and using it as a min-priority queue """
 
+import instrumentation
+
 
 class MinHeap:
     """ Class containing methods to be used on a min-heap """
@@ -8,6 +10,8 @@ class MinHeap:
         """ Inializes and builds a min-heap from input array A (which should contain comparable objects) """
         # array representing the heap
         self.array = list(A)
+        # the operations are counted in the Profile that was recording when the heap was made, if any
+        self.counts = instrumentation.counts()
         self.build_min_heap()
     
     def size(self):
@@ -20,7 +24,8 @@ class MinHeap:
     
     def parent(self, i):
         """ Returns index of parent in a heap """
-        return int(i/2)
+        # subtracting 1 because of 0-indexing
+        return (i - 1) // 2
 
     def left(self, i):
         """ Returns index of left child in a heap """
@@ -69,6 +74,8 @@ class MinHeap:
         self.array[0] = self.array[-1]
         self.array.pop()
         self.min_heapify(0)
+        if self.counts is not None:
+            self.counts["heap_pops"] += 1
         return min_result
 
     def decrease_key(self, i, key):
@@ -76,14 +83,133 @@ class MinHeap:
         if key > self.array[i]:
             raise ValueError("New key is larger than current key")
         self.array[i] = key
-        while i > 0 and self.array[parent(i)] > self.array[i]:
-            self.array[i], self.array[parent(i)] = self.array[parent(i)], self.array[i]
-            i = parent(i)
+        while i > 0 and self.array[self.parent(i)] > self.array[i]:
+            self.array[i], self.array[self.parent(i)] = self.array[self.parent(i)], self.array[i]
+            i = self.parent(i)
+        if self.counts is not None:
+            self.counts["heap_decrease_keys"] += 1
     
     def print(self):
         print(self.array)
 
 
+class IndexedMinHeap:
+    """
+        Min-priority queue of items with separate keys, which keeps track of the index of every item in the heap.
+        This makes decrease_key and contains possible without knowing where the item is stored
+    """
+
+    def __init__(self, items=()):
+        """ Initializes and builds the heap from an optional iterable of (item, key) pairs """
+        # the operations are counted in the Profile that was recording when the heap was made, if any
+        self.counts = instrumentation.counts()
+        self.items = []
+        self.keys = []
+        # position[item] is the index of item in self.items and self.keys
+        self.position = {}
+        for item, key in items:
+            if item in self.position:
+                raise ValueError("Item is already in the heap")
+            self.position[item] = len(self.items)
+            self.items.append(item)
+            self.keys.append(key)
+        for i in range(len(self.items) // 2, -1, -1):
+            self._sift_down(i)
+
+    def size(self):
+        """ Returns size of the heap """
+        return len(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, item):
+        """ Checks if item is in the heap in O(1) """
+        return item in self.position
+
+    def __iter__(self):
+        """ Makes the heap iterable """
+        return self.items.__iter__()
+
+    def key(self, item):
+        """ Returns the current key of item """
+        return self.keys[self.position[item]]
+
+    def _swap(self, i, j):
+        """ Swaps the items at index i and j, and updates their positions """
+        self.items[i], self.items[j] = self.items[j], self.items[i]
+        self.keys[i], self.keys[j] = self.keys[j], self.keys[i]
+        self.position[self.items[i]] = i
+        self.position[self.items[j]] = j
+
+    def _sift_up(self, i):
+        """ Moves the item at index i up until its parent has a smaller or equal key """
+        while i > 0:
+            parent = (i - 1) // 2
+            if self.keys[parent] <= self.keys[i]:
+                break
+            self._swap(i, parent)
+            i = parent
+
+    def _sift_down(self, i):
+        """ Moves the item at index i down until both its children have larger or equal keys """
+        n = len(self.items)
+        while True:
+            l_index = 2 * i + 1
+            r_index = l_index + 1
+            smallest_index = i
+            if l_index < n and self.keys[l_index] < self.keys[smallest_index]:
+                smallest_index = l_index
+            if r_index < n and self.keys[r_index] < self.keys[smallest_index]:
+                smallest_index = r_index
+            if smallest_index == i:
+                return
+            self._swap(i, smallest_index)
+            i = smallest_index
+
+    def insert(self, item, key):
+        """ Inserts item with the given key """
+        if item in self.position:
+            raise ValueError("Item is already in the heap")
+        self.position[item] = len(self.items)
+        self.items.append(item)
+        self.keys.append(key)
+        self._sift_up(len(self.items) - 1)
+        if self.counts is not None:
+            self.counts["heap_pushes"] += 1
+
+    def minimum(self):
+        """ Returns the item with the minimal key """
+        return self.items[0]
+
+    def extract_min(self):
+        """ Removes and returns the item with the minimal key """
+        if len(self.items) < 1:
+            raise ValueError("Heap is empty")
+        min_result = self.items[0]
+        self._swap(0, len(self.items) - 1)
+        self.items.pop()
+        self.keys.pop()
+        del self.position[min_result]
+        self._sift_down(0)
+        if self.counts is not None:
+            self.counts["heap_pops"] += 1
+        return min_result
+
+    def decrease_key(self, item, key):
+        """ Decreases the key of item and makes sure it is still at the right place in the heap """
+        i = self.position[item]
+        if key > self.keys[i]:
+            raise ValueError("New key is larger than current key")
+        self.keys[i] = key
+        self._sift_up(i)
+        if self.counts is not None:
+            self.counts["heap_decrease_keys"] += 1
+
+    def print(self):
+        print(list(zip(self.items, self.keys)))
+
+
 def test(): 
     a = [4, 1, 3, 2, 16, 9, 10, 14, 8, 7]
 
@@ -98,3 +224,16 @@ def test():
     heap.print()
 
 # test()
+
+
+def test2():
+    """ Test for the indexed min-heap """
+    heap = IndexedMinHeap([("a", 4), ("b", 1), ("c", 3)])
+    heap.insert("d", 2)
+    heap.decrease_key("c", 0)
+    heap.print()
+    while heap.size() > 0:
+        print(heap.extract_min(), end=" ")
+    print()
+
+# test2()
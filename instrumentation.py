@@ -0,0 +1,111 @@
+""" Operation counters and phase timers for the algorithms, which cost (almost) nothing when they are not enabled """
+
+import time
+from collections import Counter, defaultdict
+from contextlib import nullcontext
+from contextvars import ContextVar
+
+
+# the Profile that is recording in the current thread (or asyncio task), or None. The algorithms read it once
+# per call and only count if it is set, so a Profile only counts the work done in the context that entered it
+_active = ContextVar("active_profile", default=None)
+
+_NO_PHASE = nullcontext()
+
+
+class Profile:
+    """
+        Records counts of operations (like relaxations, heap operations, comparisons and swaps) and, if timers is True,
+        the time spent in named phases, while it is used in a with-statement. Only the work done in the same thread
+        is recorded, so queries running in other threads are not counted:\n
+        with Profile() as profile:
+            dijkstra(G, s)
+        print(profile.as_dict())
+    """
+
+    def __init__(self, timers=False):
+        self.counts = Counter()
+        self.times = defaultdict(float)
+        self.calls = Counter()
+        self.timers = timers
+        # tokens for restoring the Profile that was active before, one for every with-statement using this Profile
+        self.tokens = []
+
+    def __enter__(self):
+        self.tokens.append(_active.set(self))
+        return self
+
+    def __exit__(self, *exception):
+        _active.reset(self.tokens.pop())
+        return False
+
+    def phase(self, name):
+        """ Context manager that adds the time spent in it to times[name] """
+        return _Phase(self, name)
+
+    def reset(self):
+        """ Removes all counts and times """
+        self.counts.clear()
+        self.times.clear()
+        self.calls.clear()
+
+    def as_dict(self):
+        """ Returns the counts and times as a dict """
+        result = dict(self.counts)
+        for name, seconds in self.times.items():
+            result[f"{name}.seconds"] = seconds
+            result[f"{name}.calls"] = self.calls[name]
+        return result
+
+
+class _Phase:
+    """ Timer for one phase of a Profile """
+
+    def __init__(self, profile, name):
+        self.profile = profile
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exception):
+        self.profile.times[self.name] += time.perf_counter() - self.start
+        self.profile.calls[self.name] += 1
+        return False
+
+
+def active():
+    """ Returns the Profile that is recording in the current thread, or None """
+    return _active.get()
+
+
+def counts():
+    """ Returns the Counter of the active Profile, or None if no Profile is recording """
+    profile = _active.get()
+    return profile.counts if profile is not None else None
+
+
+def phase(name):
+    """ Times the phase name in the active Profile if it has timers, otherwise does nothing """
+    profile = _active.get()
+    if profile is not None and profile.timers:
+        return profile.phase(name)
+    return _NO_PHASE
+
+
+def test():
+    """ Test for counting operations """
+    from heaps import IndexedMinHeap
+
+    with Profile(timers=True) as profile:
+        with phase("heap"):
+            Q = IndexedMinHeap([(i, -i) for i in range(10)])
+            Q.insert(10, 5)
+            Q.decrease_key(10, -20)
+            while Q.size() > 0:
+                Q.extract_min()
+    print(profile.as_dict())
+
+# test()
@@ -1,121 +1,304 @@
-""" Minimum Spanning Trees using Kruskal and Prim """
+""" Minimum Spanning Trees using Kruskal, Borůvka and Prim """
 
 import sys
-from queue import PriorityQueue
-from graph_structs import Graph, Vertex
-from heaps import MinHeap
+from array import array
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
-def make_set(v):
-    """ Initializes a set with only one vertex """
-    v.p = v
-    v.rank = 0
+import instrumentation
+from disjoint_set import DisjointSet
+from graph_structs import Graph, Vertex, SearchState
+from heaps import IndexedMinHeap
+from shared_arrays import SharedArrays, attached
+from shortest_all_to_all import has_integer_weights
 
 
-def union(v1, v2):
-    """ Unites two vertices by linking their roots """
-    link(find_set(v1), find_set(v2))
+INF = float("inf")
 
 
-def link(v1, v2):
-    """ Links two vertices by looking at their ranks """
-    if v1.rank > v2.rank:
-        v2.p = v1
-    else:
-        v1.p = v2
-        if v1.rank == v2.rank:
-            v2.rank += 1
+def edge_arrays(G):
+    """ Returns the edges of G as three lists sources, targets and weights, where the vertices are indexes in G.V """
+    index = {v: i for i, v in enumerate(G.V)}
+    sources = []
+    targets = []
+    weights = []
+    for u, v, weight in G.E:
+        sources.append(index[u])
+        targets.append(index[v])
+        weights.append(weight)
+    return sources, targets, weights
 
 
-def find_set(v):
-    """ Finds the root of the set containing v """
-    if v != v.p:
-        v.p = find_set(v.p)
-    return v.p
+def kruskal(G):
+    """
+        Implementation of Kruskal to find MST, using an integer DisjointSet.
+        Returns the edges (u, v, weight) of the tree and its total weight
+    """
+    result = []
+    total_weight = 0
+    sources, targets, weights = edge_arrays(G)
+    sets = DisjointSet(len(G.V))
+    # sorts the edges by weight in increasing order (without changing G)
+    with instrumentation.phase("kruskal.sort"):
+        if np is not None:
+            order = np.argsort(np.asarray(weights), kind="stable").tolist()
+        else:
+            order = sorted(range(len(weights)), key=weights.__getitem__)
+    with instrumentation.phase("kruskal.union"):
+        for i in order:
+            if sets.union(sources[i], targets[i]):
+                result.append((G.V[sources[i]], G.V[targets[i]], weights[i]))
+                total_weight += weights[i]
+                if sets.count == 1:
+                    break
+    return result, total_weight
 
 
-def kruskal(G):
-    """ Implementation of Kruskal to find MST """
+def _cheapest_edges(sources, targets, weights, component, edges):
+    """
+        Returns a dict with the cheapest edge index leaving every component, for the edge indexes in edges.
+        Edges are compared by (weight, smallest endpoint, largest endpoint), so ties are broken the same way everywhere
+    """
+    cheapest = {}
+    for i in edges:
+        u = sources[i]
+        v = targets[i]
+        cu = component[u]
+        cv = component[v]
+        if cu == cv:
+            continue
+        key = (weights[i], min(u, v), max(u, v))
+        for c in (cu, cv):
+            if c not in cheapest or key < cheapest[c][0]:
+                cheapest[c] = (key, i)
+    return cheapest
+
+
+def _cheapest_edges_shared(edges):
+    """ _cheapest_edges for a range of edges in the shared memory of a worker process """
+    (sources, targets, weights, component), _ = attached()
+    return _cheapest_edges(sources, targets, weights, component, edges)
+
+
+def boruvka(G, processes=1):
+    """
+        Implementation of Borůvka to find MST. In every round, each component picks its cheapest edge to
+        another component, and all these edges are added to the tree at once, which at least halves the number
+        of components.\n
+        With processes > 1, the search for the cheapest edges is split between worker processes, which read the edges
+        and component labels from shared memory (the weights as int64 if they are all integers, otherwise as float64). Returns the edges (u, v, weight) of the tree (a forest if G is
+        not connected) and its total weight
+    """
+    n = len(G.V)
+    sources, targets, weights = edge_arrays(G)
+    m = len(sources)
+    sets = DisjointSet(n)
     result = []
     total_weight = 0
-    for u in G.V:
-        make_set(u)
-    # sorts the edges by weight in increasing order
-    G.E.sort(key=lambda edge: edge[2])
-    for u, v, weight in G.E:
-        # edge format: (u, v, weight)
-        if find_set(u) != find_set(v):
-            result.append((u, v, weight))
-            total_weight += weight
-            union(u, v)
-    print(result, "Minimal weight:", total_weight)
 
+    pool = None
+    shared = None
+    if processes > 1 and m > 0:
+        typecode = "q" if has_integer_weights(G) else "d"
+        shared = SharedArrays([("q", m), ("q", m), (typecode, m), ("q", n)])
+        shared[0][:] = array("q", sources)
+        shared[1][:] = array("q", targets)
+        shared[2][:] = array(typecode, weights)
+        component = shared[3]
+        pool = shared.pool(processes)
+        chunk_size = max(1, m // processes)
+        chunks = [range(start, min(start + chunk_size, m)) for start in range(0, m, chunk_size)]
+
+    try:
+        while True:
+            if pool is not None:
+                component[:] = sets.find_all()
+                cheapest = {}
+                for part in pool.map(_cheapest_edges_shared, chunks):
+                    for c, (key, i) in part.items():
+                        if c not in cheapest or key < cheapest[c][0]:
+                            cheapest[c] = (key, i)
+            else:
+                cheapest = _cheapest_edges(sources, targets, weights, sets.find_all(), range(m))
 
-def prim(G, s):
-    """ Implementation of Prims to find MST """
+            if not cheapest:
+                break
+            for key, i in cheapest.values():
+                if sets.union(sources[i], targets[i]):
+                    result.append((G.V[sources[i]], G.V[targets[i]], weights[i]))
+                    total_weight += weights[i]
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        if shared is not None:
+            shared.close()
 
-    for v in G.V:
-        v.rank = sys.maxsize
-        v.p = None
-    s.rank = 0
-    Q = MinHeap(G.V)
+    return result, total_weight
+
+
+def prim_heap(G, s):
+    """
+        Implementation of Prims to find MST with an indexed min-heap, for sparse graphs. Vertices are only put in
+        the heap when they are first reached, and every tree edge is recorded when its vertex is extracted.
+        Returns the edges (u, v, weight) of the tree spanning the vertices reachable from s and its total weight
+    """
+
+    counts = instrumentation.counts()
+    state = SearchState()
+    state.key[s] = 0
+    Q = IndexedMinHeap([(s, 0)])
+    in_tree = set()
+    result = []
+    total_weight = 0
 
     while Q.size() > 0:
         u = Q.extract_min()
-        for v, weigth in G.adj(u):
-            if v in Q and weigth < v.rank:
-                # updates the predecessor and rank such that we are getting spanning tree with lowest total edge weight
-                v.p = u
-                v.rank = weigth
-                # update heap since ranks have changed
-                Q.build_min_heap()
-
-    # find all the edges that spans the tree
+        in_tree.add(u)
+        if u != s:
+            result.append((state.p[u], u, state.key[u]))
+            total_weight += state.key[u]
+        edges = G.adj(u)
+        if counts is not None:
+            counts["relaxations"] += len(edges)
+        for v, weigth in edges:
+            if v not in in_tree and weigth < state.key[v]:
+                # updates the predecessor and key such that we are getting spanning tree with lowest total edge weight
+                state.p[v] = u
+                state.key[v] = weigth
+                # move v up in the heap since its key has decreased
+                if v in Q:
+                    Q.decrease_key(v, weigth)
+                else:
+                    Q.insert(v, weigth)
+
+    return result, total_weight
+
+
+def prim_dense(G, s):
+    """
+        Implementation of Prims to find MST in O(V^2) time with arrays instead of a heap, for dense graphs
+        (for example from a distance matrix). In each step the vertex with the smallest key is found with one
+        scan of the key array, and the keys are updated with the row of its edge weights (vectorized with numpy if installed).
+        Returns the edges (u, v, weight) of the tree spanning the vertices reachable from s and its total weight
+    """
+    n = len(G.V)
+    index = {v: i for i, v in enumerate(G.V)}
+    integer_weights = has_integer_weights(G)
+    no_edge = INF
+
+    # W[u][v] is the smallest weight of an edge u -> v, no_edge if there is none
+    if np is not None:
+        # integer weights are kept exact in an int64 matrix, with sys.maxsize for no edge like in weight_array
+        if integer_weights:
+            dtype, no_edge = np.int64, sys.maxsize
+        else:
+            dtype = np.float64
+        W = np.full((n, n), no_edge, dtype=dtype)
+        sources, targets, weights = edge_arrays(G)
+        np.minimum.at(W, (np.asarray(sources, dtype=np.int64), np.asarray(targets, dtype=np.int64)), np.asarray(weights, dtype=dtype))
+        key = np.full(n, no_edge, dtype=dtype)
+        parent = np.full(n, -1, dtype=np.int64)
+        in_tree = np.zeros(n, dtype=bool)
+    else:
+        W = [[INF] * n for _ in range(n)]
+        for u in G.V:
+            for v, weight in G.adj(u):
+                W[index[u]][index[v]] = min(W[index[u]][index[v]], weight)
+        key = [INF] * n
+        parent = [-1] * n
+        in_tree = [False] * n
+
     result = []
     total_weight = 0
-    for u in G.V:
-        for v, weigth in G.adj(u):
-            if v.p == u and (u, v, weigth) not in result:
-                result.append((u, v, weigth))
-                total_weight += weigth
-
-    print(result, "Minimal weight:", total_weight)
-
-
-v1 = Vertex(1)
-v2 = Vertex(2)
-v3 = Vertex(3)
-v4 = Vertex(4)
-v5 = Vertex(5)
-v6 = Vertex(6)
-v7 = Vertex(7)
-
-# adding undirected edges by adding directed edges from both u to v and v to u
-v1.add_edge(v2, 2)
-v2.add_edge(v1, 2)
-v1.add_edge(v3, 4)
-v3.add_edge(v1, 4)
-v2.add_edge(v3, 12)
-v3.add_edge(v2, 12)
-v1.add_edge(v5, 32)
-v5.add_edge(v1, 32)
-v5.add_edge(v4, 11)
-v4.add_edge(v5, 11)
-v4.add_edge(v3, 2)
-v3.add_edge(v4, 2)
-v6.add_edge(v7, 1)
-v7.add_edge(v6, 1)
-v5.add_edge(v6, 9)
-v6.add_edge(v5, 9)
-v5.add_edge(v7, 2)
-v7.add_edge(v5, 2)
-v7.add_edge(v3, 4)
-v3.add_edge(v7, 4)
-
-g = Graph(v1, v2, v3, v4, v5, v6, v7)
-g.print()
-print("MST by Kruskal:")
-kruskal(g)
-print("MST by Prim, started in v1 ... v7:")
-for v in g.V:
-    prim(g, v)
+    u = index[s]
+    key[u] = 0
+    for _ in range(n):
+        if np is not None:
+            u = int(np.argmin(np.where(in_tree, no_edge, key)))
+        else:
+            u = min((i for i in range(n) if not in_tree[i]), key=key.__getitem__)
+        if key[u] == no_edge:
+            # the rest of the vertices can not be reached from s
+            break
+        in_tree[u] = True
+        if parent[u] >= 0:
+            weight = int(key[u]) if integer_weights else float(key[u])
+            result.append((G.V[parent[u]], G.V[u], weight))
+            total_weight += weight
+
+        # updates the keys and parents of the vertices not in the tree that get a cheaper edge from u
+        if np is not None:
+            cheaper = ~in_tree & (W[u] < key)
+            key[cheaper] = W[u][cheaper]
+            parent[cheaper] = u
+        else:
+            for v in range(n):
+                if not in_tree[v] and W[u][v] < key[v]:
+                    key[v] = W[u][v]
+                    parent[v] = u
+
+    return result, total_weight
+
+
+def prim(G, s, dense_threshold=0.25):
+    """
+        Implementation of Prims to find MST, using prim_dense if more than dense_threshold of all possible
+        edges are in G, otherwise prim_heap. Returns the edges (u, v, weight) of the tree and its total weight
+    """
+    n = len(G.V)
+    m = sum(len(G.adj(u)) for u in G.V)
+    if n > 1 and m > dense_threshold * n * (n - 1):
+        return prim_dense(G, s)
+    return prim_heap(G, s)
+
+
+def test():
+    """ Test for Kruskal, Borůvka and Prim """
+    v1 = Vertex(1)
+    v2 = Vertex(2)
+    v3 = Vertex(3)
+    v4 = Vertex(4)
+    v5 = Vertex(5)
+    v6 = Vertex(6)
+    v7 = Vertex(7)
+
+    # adding undirected edges by adding directed edges from both u to v and v to u
+    v1.add_edge(v2, 2)
+    v2.add_edge(v1, 2)
+    v1.add_edge(v3, 4)
+    v3.add_edge(v1, 4)
+    v2.add_edge(v3, 12)
+    v3.add_edge(v2, 12)
+    v1.add_edge(v5, 32)
+    v5.add_edge(v1, 32)
+    v5.add_edge(v4, 11)
+    v4.add_edge(v5, 11)
+    v4.add_edge(v3, 2)
+    v3.add_edge(v4, 2)
+    v6.add_edge(v7, 1)
+    v7.add_edge(v6, 1)
+    v5.add_edge(v6, 9)
+    v6.add_edge(v5, 9)
+    v5.add_edge(v7, 2)
+    v7.add_edge(v5, 2)
+    v7.add_edge(v3, 4)
+    v3.add_edge(v7, 4)
+
+    g = Graph(v1, v2, v3, v4, v5, v6, v7)
+    g.print()
+    print("MST by Kruskal:")
+    print(*kruskal(g))
+    print("MST by Borůvka:")
+    print(*boruvka(g))
+    print("MST by Prim, started in v1 ... v7:")
+    for v in g.V:
+        print(*prim(g, v))
+    print("MST by dense Prim and heap Prim:")
+    print(*prim_dense(g, v1))
+    print(*prim_heap(g, v1))
+
+# test()
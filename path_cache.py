@@ -0,0 +1,149 @@
+""" Cache of shortest path trees, for queries that repeat the same source """
+
+import sys
+from collections import OrderedDict
+from graph_structs import Graph, Vertex
+from shortest_one_to_all import bellman_ford, DAG_shortest_paths, dijkstra
+
+
+ALGORITHMS = {
+    "dijkstra": dijkstra,
+    "bellman_ford": bellman_ford,
+    "DAG_shortest_paths": DAG_shortest_paths,
+}
+
+
+def state_size(state):
+    """ Estimates the memory used by the distances and predecessors of a SearchState in bytes """
+    return sys.getsizeof(state.d) + sys.getsizeof(state.p)
+
+
+def result_size(result):
+    """ Estimates the memory used by a result of one of the ALGORITHMS, which is a SearchState or (bool, SearchState) """
+    if isinstance(result, tuple):
+        return sum(result_size(part) for part in result)
+    if hasattr(result, "d"):
+        return state_size(result)
+    return sys.getsizeof(result)
+
+
+class ShortestPathCache:
+    """
+        Stores the results of dijkstra, bellman_ford and DAG_shortest_paths keyed by (graph version, source, algorithm).
+        When the total size of the stored results is larger than max_bytes, the least recently used results are removed.
+        A graph gets a new version when an edge is added with add_edge (or a weight of a CSRGraph is changed), and
+        all results for its older versions are removed the next time the graph is used.\n
+        The results are shared between the queries, so they must not be changed by the caller
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        # (graph, version, source, algorithm) -> (result, size), ordered from least to most recently used
+        self.entries = OrderedDict()
+        # graph -> [version, number of results] for every graph in the cache
+        self.graphs = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def query(self, G, s, algorithm="dijkstra"):
+        """ Returns the result of algorithm (a name in ALGORITHMS) from s on G, computing it only if it is not cached """
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown algorithm {algorithm}")
+        if G in self.graphs and self.graphs[G][0] != G.version:
+            self.invalidate(G)
+        key = (G, G.version, s, algorithm)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return entry[0]
+
+        self.misses += 1
+        result = ALGORITHMS[algorithm](G, s)
+        size = result_size(result)
+        if size <= self.max_bytes:
+            self.entries[key] = (result, size)
+            self.graphs.setdefault(G, [G.version, 0])[1] += 1
+            self.bytes += size
+            self._evict()
+        return result
+
+    def dijkstra(self, G, s):
+        """ Cached dijkstra(G, s) """
+        return self.query(G, s, "dijkstra")
+
+    def bellman_ford(self, G, s):
+        """ Cached bellman_ford(G, s) """
+        return self.query(G, s, "bellman_ford")
+
+    def DAG_shortest_paths(self, G, s):
+        """ Cached DAG_shortest_paths(G, s) """
+        return self.query(G, s, "DAG_shortest_paths")
+
+    def _evict(self):
+        """ Removes the least recently used results until the cache fits in max_bytes """
+        while self.bytes > self.max_bytes:
+            key, (result, size) = self.entries.popitem(last=False)
+            self.bytes -= size
+            self.evictions += 1
+            graph = self.graphs[key[0]]
+            graph[1] -= 1
+            if graph[1] == 0:
+                del self.graphs[key[0]]
+
+    def invalidate(self, G=None):
+        """ Removes all results for G, or all results if G is None """
+        for key in [key for key in self.entries if G is None or key[0] is G]:
+            self.bytes -= self.entries.pop(key)[1]
+            self.invalidations += 1
+        if G is None:
+            self.graphs.clear()
+        else:
+            self.graphs.pop(G, None)
+
+    def hit_rate(self):
+        """ Returns the fraction of queries that were answered from the cache """
+        queries = self.hits + self.misses
+        return self.hits / queries if queries > 0 else 0.0
+
+    def stats(self):
+        """ Returns the counters of the cache as a dict """
+        return {
+            "entries": len(self.entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hit_rate(),
+        }
+
+
+def test():
+    """ Test for the shortest path cache """
+    s = Vertex("s")
+    t = Vertex("t")
+    x = Vertex("x")
+    y = Vertex("y")
+
+    s.add_edge(t, 10)
+    s.add_edge(y, 5)
+    t.add_edge(x, 1)
+    y.add_edge(t, 3)
+
+    g = Graph(s, t, x, y)
+    cache = ShortestPathCache()
+    print(cache.dijkstra(g, s).d[x])
+    print(cache.dijkstra(g, s).d[x])
+    y.add_edge(x, 2)
+    print(cache.dijkstra(g, s).d[x])
+    print(cache.stats())
+
+# test()
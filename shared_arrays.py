@@ -0,0 +1,75 @@
+""" Arrays in shared memory for pools of worker processes, which read and write them without pickling the data """
+
+import multiprocessing
+from array import array
+from multiprocessing import shared_memory
+
+
+class SharedArrays:
+    """
+        Makes one shared memory block for every (typecode, length) in layout, where typecode is an array typecode
+        like 'q' or 'd'. shared[i] is a memoryview of block i with the typecode, and the blocks are removed by close
+        (or at the end of a with-statement). Worker processes from pool attach to the same blocks when they start
+        and get them from attached(), so every worker attaches once instead of once per task
+    """
+
+    def __init__(self, layout):
+        self.layout = [(typecode, length) for typecode, length in layout]
+        self.blocks = []
+        self.views = []
+        try:
+            for typecode, length in self.layout:
+                size = array(typecode).itemsize * length
+                # a block can not be empty, but the view has the requested length
+                block = shared_memory.SharedMemory(create=True, size=max(size, 8))
+                self.blocks.append(block)
+                self.views.append(block.buf[:size].cast(typecode))
+        except BaseException:
+            self.close()
+            raise
+
+    def __getitem__(self, i):
+        return self.views[i]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+        return False
+
+    def pool(self, processes, *initargs):
+        """ Returns a multiprocessing.Pool whose workers attach to the blocks, initargs are passed on to attached() """
+        names = [block.name for block in self.blocks]
+        return multiprocessing.Pool(processes, initializer=_attach, initargs=(self.layout, names, initargs))
+
+    def close(self):
+        """ Releases the views and removes the blocks, any numpy arrays of the views must be deleted before """
+        for view in self.views:
+            view.release()
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.views = []
+        self.blocks = []
+
+
+# (blocks, views, initargs) in a worker process of SharedArrays.pool, set when the worker starts
+_attached = None
+
+
+def _attach(layout, names, initargs):
+    """ Initializer for the worker processes, attaches to the shared memory blocks """
+    global _attached
+    blocks = [shared_memory.SharedMemory(name=name) for name in names]
+    views = [
+        block.buf[:array(typecode).itemsize * length].cast(typecode)
+        for block, (typecode, length) in zip(blocks, layout)
+    ]
+    _attached = (blocks, views, initargs)
+
+
+def attached():
+    """ Returns the views of the shared arrays and the initargs given to SharedArrays.pool, in a worker process """
+    blocks, views, initargs = _attached
+    return views, initargs
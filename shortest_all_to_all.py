@@ -1,8 +1,21 @@
 """ All-Pairs Shortest Paths solutions using Floyd-Warshall and Johnson """
 
+import os
 import sys
-from graph_structs import Graph, Vertex
-from shortest_one_to_all import bellman_ford, dijkstra
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import instrumentation
+from shared_arrays import SharedArrays, attached
+from graph_structs import Graph, Vertex, CSRGraph
+from heaps import IndexedMinHeap
+from shortest_one_to_all import bellman_ford_queue, dijkstra
+
+
+INF = float("inf")
 
 
 def weight_matrix(G):
@@ -33,10 +46,23 @@ def predecessor_matrix(G):
     return P
 
 
-def floyd_warshall(G):
+def print_matrices(D, P, k):
+    """ Prints D and P after step k of floyd-warshall """
+    print(f"D for k = {k}")
+    for row in D:
+        print(row)
+    print()
+    print(f"P for k = {k}")
+    for row in P:
+        print(row)
+    print()
+
+
+def floyd_warshall(G, debug=False):
     """ 
     Takes a graph G in matrix-representation as input.\n
-    Returns all-pair shortest paths as a matrix D, and the vertex predecessors for the shortest paths as a matrix P 
+    Returns all-pair shortest paths as a matrix D, and the vertex predecessors for the shortest paths as a matrix P.\n
+    With debug, D and P are printed for every k
     """
 
     n = len(G.V)
@@ -44,14 +70,8 @@ def floyd_warshall(G):
     P = predecessor_matrix(G)
 
     # prints inital D and P (when k = 0)
-    print("D for k = 0")
-    for row in D:
-        print(row)
-    print("P for k = 0")
-    print()
-    for row in P:
-        print(row)
-    print()
+    if debug:
+        print_matrices(D, P, 0)
 
     for k in range(n):
         for i in range(n):
@@ -62,57 +82,247 @@ def floyd_warshall(G):
                     P[i][j] = P[k][j]
 
         # prints D and P for each k
-        print(f"D for k = {k + 1}")
-        for row in D:
-            print(row)
-        print()
-        print(f"P for k = {k + 1}")
-        for row in P:
-            print(row)
-        print()
+        if debug:
+            print_matrices(D, P, k + 1)
+
+    counts = instrumentation.counts()
+    if counts is not None:
+        counts["relaxations"] += n ** 3
 
     # returns D and P when k = (n-1), resulting in a matrix containing shortest paths between all pairs of nodes in D
     return D, P
 
 
-def johnson(G):
-    """ 
-    Finds all-pair shortest paths in sparse graphs using bellman-ford and dijkstra as subroutines. \n
-    Returns matrix D with computed shortest paths from u to v in D[u][v]
+def has_integer_weights(G):
+    """ Returns True if all edge weights of G are integers that fit in an int64 """
+    return all(isinstance(weight, int) and -sys.maxsize <= weight <= sys.maxsize for u in G.V for v, weight in G.adj(u))
+
+
+def weight_array(G):
+    """
+        Returns D and P of G as numpy arrays, where D[u.rank, v.rank] is the weight of the edge from u to v
+        and P[u.rank, v.rank] is u.rank for edges u -> v (-1 if there is no edge).
+        If all weights are integers, D is an int64 array with sys.maxsize where there is no edge, such that the
+        distances stay exact, otherwise it is a float array with inf where there is no edge
+    """
+    n = len(G.V)
+    if has_integer_weights(G):
+        D = np.full((n, n), sys.maxsize, dtype=np.int64)
+    else:
+        D = np.full((n, n), np.inf)
+    np.fill_diagonal(D, 0)
+    P = np.full((n, n), -1, dtype=np.int64)
+    for u in G.V:
+        for v, weight in G.adj(u):
+            D[u.rank, v.rank] = weight
+            P[u.rank, v.rank] = u.rank
+    return D, P
+
+
+def _add(a, b):
+    """ Returns a + b for arrays of distances, where no path (sys.maxsize in int64 arrays) plus anything is no path """
+    if a.dtype != np.int64:
+        return a + b
+    # the sum wraps around in int64 when a or b is sys.maxsize, those entries are replaced
+    return np.where((a == sys.maxsize) | (b == sys.maxsize), sys.maxsize, a + b)
+
+
+def _floyd_warshall_tile(D, P, rows, cols, ks):
+    """ Runs the steps k in ks of floyd-warshall on the tile D[rows, cols] """
+    D_tile = D[rows, cols]
+    P_tile = P[rows, cols]
+    for k in range(ks.start, ks.stop):
+        via = _add(D[rows, k][:, None], D[k, cols][None, :])
+        shorter = via < D_tile
+        D_tile[shorter] = via[shorter]
+        P_tile[shorter] = np.broadcast_to(P[k, cols], shorter.shape)[shorter]
+
+
+def floyd_warshall_vectorized(G, block_size=None, debug=False, as_arrays=False):
+    """
+        Floyd-warshall where every step k is done as one numpy operation on the whole matrix, instead of looping over i and j.\n
+        With block_size, the matrix is split into tiles of block_size x block_size, and block_size steps of k are
+        done on one tile at a time (first the diagonal tile, then its row and column, then the rest), such that
+        the tiles being updated fit in the cache for large n. The distances are the same, but among paths
+        of equal length the blocked version may pick a different predecessor. With debug, D and P are printed for
+        every k, or after every block of k with block_size.\n
+        Returns D and P in the same format as floyd_warshall, or as the numpy arrays of weight_array with as_arrays.
+        Falls back to floyd_warshall if numpy is not installed
     """
+    if np is None:
+        return floyd_warshall(G, debug=debug)
 
-    # add a new vertex s to a copy of G, called G_s, where there is an edge (s, v, 0) for all v in G.V
-    s = Vertex("s", -1)
+    n = len(G.V)
+    D, P = weight_array(G)
+
+    if debug:
+        print_matrices(*_matrices_to_lists(G, D, P), 0)
+
+    if block_size is None:
+        for k in range(n):
+            # if path i -> k -> j is shorter than i -> j, for all i and j at once
+            via = _add(D[:, k, None], D[None, k, :])
+            shorter = via < D
+            np.copyto(D, via, where=shorter)
+            np.copyto(P, np.broadcast_to(P[k, :], (n, n)), where=shorter)
+            if debug:
+                print_matrices(*_matrices_to_lists(G, D, P), k + 1)
+    else:
+        blocks = [slice(start, min(start + block_size, n)) for start in range(0, n, block_size)]
+        for ks in blocks:
+            # the diagonal tile, then the tiles in the same row and column, and then the rest
+            _floyd_warshall_tile(D, P, ks, ks, ks)
+            for other in blocks:
+                if other != ks:
+                    _floyd_warshall_tile(D, P, ks, other, ks)
+                    _floyd_warshall_tile(D, P, other, ks, ks)
+            for rows in blocks:
+                for cols in blocks:
+                    if rows != ks and cols != ks:
+                        _floyd_warshall_tile(D, P, rows, cols, ks)
+            if debug:
+                print_matrices(*_matrices_to_lists(G, D, P), ks.stop)
+
+    counts = instrumentation.counts()
+    if counts is not None:
+        counts["relaxations"] += n ** 3
+
+    if as_arrays:
+        return D, P
+    return _matrices_to_lists(G, D, P)
+
+
+def _matrices_to_lists(G, D, P):
+    """ Converts D and P from numpy arrays to lists of lists, with sys.maxsize for no path and vertices in P """
+    vertices = [None] * len(G.V)
     for v in G.V:
-        s.add_edge(v, 0)
-    G_s = Graph(*G.V, s)
+        vertices[v.rank] = v
+    if D.dtype == np.int64:
+        D_list = D.tolist()
+    else:
+        D_list = [[sys.maxsize if d == np.inf else d for d in row] for row in D.tolist()]
+    P_list = [[vertices[p] if p >= 0 else None for p in row] for row in P.tolist()]
+    return D_list, P_list
 
-    # run bellman-ford to compute v.d from s for all v in G_s.V
-    if not bellman_ford(G_s, s):
-        raise ValueError("Input graph contains a negative-weight cycle")
 
-    # h is an array satisfying h[v.rank] = v.d, computed from bellman-ford above
-    # here v.rank is used as an index
-    h = [0 for i in range(len(G_s.V))]
-    for v in G_s.V:
-        h[v.rank] = v.d
+def johnson_potential(G):
+    """
+        Returns a dict h such that weight + h[u] - h[v] is non-negative for every edge u -> v in G,
+        raises ValueError if G contains a negative-weight cycle
+    """
 
-    # make every edge non-negative
-    for u in G_s.V:
-        for edge in G_s.adj(u):
-            # edge format: (v, weight)
-            edge[1] = edge[1] + h[u.rank] - h[edge[0].rank]
+    # run queue-based bellman-ford from all vertices at once, which gives the distance d[v] from a virtual vertex s
+    # with an edge (s, v, 0) for all v in G.V, without adding s to G (so it also works on a CSRGraph)
+    cycle, state = bellman_ford_queue(G, *G.V)
+    if cycle is not None:
+        raise ValueError(f"Input graph contains a negative-weight cycle: {cycle}")
+
+    # h is a dict satisfying h[v] = d[v], computed from bellman-ford above
+    return {v: state.d[v] for v in G.V}
+
+
+def johnson(G):
+    """ 
+    Finds all-pair shortest paths in sparse graphs using bellman-ford and dijkstra as subroutines. \n
+    Returns matrix D with computed shortest paths from u to v in D[u][v], and sys.maxsize where there is no path
+    """
+
+    with instrumentation.phase("johnson.potential"):
+        h = johnson_potential(G)
 
     # n x n-array for storing computed all-pair shortest paths
     n = len(G.V)
     D = [[None for i in range(n)] for i in range(n)]
 
-    # runs dijkstra for each vertex u in G.V to compute shortest paths from u to all other vertices v
-    for u in G.V:
-        dijkstra(G, u)
-        for v in G.V:
-            # redo the re-weighting, and store the shortest paths in D
-            D[u.rank][v.rank] = v.d + h[v.rank] - h[u.rank]
+    # runs dijkstra for each vertex u in G.V to compute shortest paths from u to all other vertices v,
+    # where h makes every edge non-negative (weight + h[u] - h[v]) without changing G
+    with instrumentation.phase("johnson.dijkstra"):
+        for u in G.V:
+            state = dijkstra(G, u, potential=h)
+            for v in G.V:
+                # redo the re-weighting, and store the shortest paths in D (sys.maxsize where there is no path)
+                d = state.d[v]
+                D[u.rank][v.rank] = d + h[v] - h[u] if d != sys.maxsize else sys.maxsize
+
+    return D
+
+
+def _johnson_rows(sources):
+    """ Runs dijkstra on the shared reweighted graph from each source, and writes the rows of D directly to shared memory """
+    (offsets, targets, weights, D), (n, h) = attached()
+    # no path is stored as sys.maxsize in an integer matrix, and as inf in a float matrix
+    no_path = sys.maxsize if D.format == "q" else INF
+    for s in sources:
+        d = {s: 0}
+        Q = IndexedMinHeap([(s, 0)])
+        while Q.size() > 0:
+            u = Q.extract_min()
+            for i in range(offsets[u], offsets[u + 1]):
+                v = targets[i]
+                if d[u] + weights[i] < d.get(v, INF):
+                    d[v] = d[u] + weights[i]
+                    if v in Q:
+                        Q.decrease_key(v, d[v])
+                    else:
+                        Q.insert(v, d[v])
+        row = s * n
+        for v in range(n):
+            D[row + v] = no_path
+        for v, distance in d.items():
+            # redo the re-weighting
+            D[row + v] = distance + h[v] - h[s]
+    return len(sources)
+
+
+def johnson_parallel(G, processes=None):
+    """
+        Same as johnson, but runs the dijkstra from each vertex in a pool of worker processes.\n
+        The reweighted graph is stored as arrays in shared memory (in compressed sparse row format, indexed by v.rank),
+        so the workers read it directly instead of getting a pickled copy with every task, and every worker
+        writes its rows of D straight into a shared n x n matrix. If all weights are integers, the weights and D
+        are stored as int64, such that the distances are exact like in johnson, otherwise as float64.
+        Returns matrix D like johnson, with sys.maxsize where there is no path
+    """
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if processes == 1:
+        return johnson(G)
+
+    h_vertices = johnson_potential(G)
+    n = len(G.V)
+    h = [0] * n
+    for v in G.V:
+        h[v.rank] = h_vertices[v]
+
+    # the reweighted edges, sorted by source such that offsets[u] is the index of the first edge out of u
+    typecode = "q" if has_integer_weights(G) else "d"
+    convert = int if typecode == "q" else float
+    reweighted = CSRGraph(
+        n,
+        ((u.rank, v.rank, convert(weight + h[u.rank] - h[v.rank])) for u in G.V for v, weight in G.adj(u)),
+    )
+    m = reweighted.m
+
+    # offsets, targets, weights and the result matrix
+    with SharedArrays([("q", n + 1), ("q", m), (typecode, m), (typecode, n * n)]) as shared:
+        shared[0][:] = reweighted.offsets
+        shared[1][:] = reweighted.targets
+        shared[2][:] = reweighted.weights
+        del reweighted
+
+        # every task is a chunk of sources, a few chunks per process to balance the load
+        chunk_size = max(1, n // (4 * processes))
+        chunks = [range(start, min(start + chunk_size, n)) for start in range(0, n, chunk_size)]
+        with shared.pool(processes, n, h) as pool:
+            for _ in pool.imap_unordered(_johnson_rows, chunks):
+                pass
+
+        result = shared[3]
+        D = [[None for i in range(n)] for i in range(n)]
+        for u in range(n):
+            for v in range(n):
+                distance = result[u * n + v]
+                D[u][v] = sys.maxsize if distance == INF else distance
 
     return D
 
@@ -137,7 +347,7 @@ def test1():
     v5.add_edge(v4, 6)
 
     g = Graph(v1, v2, v3, v4, v5)
-    D, P = floyd_warshall(g)
+    D, P = floyd_warshall(g, debug=True)
 
 # test1()
 
@@ -205,3 +415,31 @@ def test3():
     print(d1 == d2)
 
 # test3()
+
+
+def test4():
+    """ Comparing outputs of johnson and parallel johnson """
+    v1 = Vertex("1", 0)
+    v2 = Vertex("2", 1)
+    v3 = Vertex("3", 2)
+    v4 = Vertex("4", 3)
+    v5 = Vertex("5", 4)
+
+    v1.add_edge(v2, 3)
+    v1.add_edge(v3, 8)
+    v1.add_edge(v5, -4)
+    v2.add_edge(v5, 7)
+    v2.add_edge(v4, 1)
+    v3.add_edge(v2, 4)
+    v4.add_edge(v3, -5)
+    v4.add_edge(v1, 2)
+    v5.add_edge(v4, 6)
+
+    g = Graph(v1, v2, v3, v4, v5)
+    print(johnson(g) == johnson_parallel(g, processes=2))
+
+    # the same graph in compressed sparse row format
+    csr = CSRGraph.from_graph(g)
+    print(johnson(csr) == johnson(g), johnson_parallel(csr, processes=2) == johnson(g))
+
+# test4()
@@ -1,63 +1,258 @@
 """ Single-Source Shortest Path solutions using Bellman-Ford, DAG-shortest-paths and Dijkstra """
 
 import sys
-from graph_structs import Graph, Vertex
+from collections import deque
+import instrumentation
+from graph_structs import Graph, Vertex, SearchState
 from graph_traversal import topological_sort
-from heaps import MinHeap
+from heaps import IndexedMinHeap
 
 
 def initialize_single_source(G, s):
-    """ Initalization for single source shortest path algorithms """
-    for v in G.V:
-        v.d = sys.maxsize
-        v.p = None
-    s.d = 0
+    """ Initalization for single source shortest path algorithms, every vertex except s starts with d = sys.maxsize """
+    state = SearchState()
+    state.d[s] = 0
+    return state
 
 
-def relax(v1, v2):
-    """ Relax is used to decrease distance estimate v.d for s to v if possible """
-    for v, weight in v1.adj:
-        if v == v2:
-            if v2.d > v1.d + weight:
-                v2.d = v1.d + weight
-                v2.p = v1
+def relax(state, v1, v2, weight, counts=None):
+    """
+        Relax is used to decrease distance estimate state.d[v2] for s to v2 if possible, using the edge v1 -> v2 with the given weight.
+        counts is the Counter of the active Profile (from instrumentation.counts(), read once by the caller) or None.
+        Returns True if state.d[v2] was decreased
+    """
+    if counts is not None:
+        counts["relaxations"] += 1
+    # vertices that are not reached yet can not give a shorter path
+    if state.d[v1] == sys.maxsize:
+        return False
+    if state.d[v2] > state.d[v1] + weight:
+        state.d[v2] = state.d[v1] + weight
+        state.p[v2] = v1
+        return True
+    return False
 
 
 def bellman_ford(G, s):
     """
         Find shortest paths from s to all other vertices, works with negative edges.\n
-        Returns True if there are no negative cycles, otherwise return False
+        Returns True if there are no negative cycles, otherwise return False, together with the SearchState
      """
-    initialize_single_source(G, s)
+    counts = instrumentation.counts()
+    state = initialize_single_source(G, s)
     for i in range(len(G.V)-1):
+        changed = False
         for u, v, weight in G.E:
-            relax(u, v)
+            if relax(state, u, v, weight, counts):
+                changed = True
+        # no distances changed in this pass, so they will not change in the next passes either
+        if not changed:
+            break
     for u, v, weight in G.E:
-        if v.d > u.d + weight:
-            return False
-    return True
-
-
-def DAG_shortest_paths(G, s):
-    """ Find shortest paths from s to all other vertices on a DAG (directed acyclic graph), works with negative edges """
-    G.V = topological_sort(G)
-    initialize_single_source(G, s)
-    q = list(G.V)
-    while q:
-        u = q.pop(0)
-        for v, weigth in G.adj(u):
-            relax(u, v)
-
-
-def dijkstra(G, s):
-    """ Find shortest paths from s to all other vertices, works only with non-negative edges """
-    initialize_single_source(G, s)
-    Q = MinHeap(G.V)
+        if state.d[u] != sys.maxsize and state.d[v] > state.d[u] + weight:
+            return False, state
+    return True, state
+
+
+def predecessor_cycle(state, v):
+    """ Returns the cycle reached by following the predecessors from v as a list of vertices in edge order, or None """
+    seen = set()
+    while v is not None and v not in seen:
+        seen.add(v)
+        v = state.p[v]
+    if v is None:
+        return None
+    cycle = [v]
+    u = state.p[v]
+    while u != v:
+        cycle.append(u)
+        u = state.p[u]
+    cycle.reverse()
+    return cycle
+
+
+def bellman_ford_queue(G, *sources):
+    """
+        Queue-based Bellman-Ford (also called SPFA), which only relaxes the edges out of vertices whose distance
+        has changed, and stops as soon as no distance changes. Works with negative edges.\n
+        With more than one source, all of them start with d = 0, which gives the same distances as a search from
+        a virtual vertex with an edge of weight 0 to every source (without adding that vertex to G).\n
+        Returns (cycle, state), where cycle is None if there are no negative cycles reachable from the sources,
+        otherwise a negative cycle as a list of vertices [v1, v2, ..., vk] with edges v1 -> v2 -> ... -> vk -> v1
+    """
+    counts = instrumentation.counts()
+    state = SearchState()
+    for s in sources:
+        state.d[s] = 0
+    n = len(G.V)
+    # edges[v] is the number of edges on the path to v found so far, a path with n edges must contain a cycle
+    edges = {s: 0 for s in sources}
+    Q = deque(edges)
+    in_queue = set(edges)
+    while Q:
+        u = Q.popleft()
+        in_queue.discard(u)
+        for v, weight in G.adj(u):
+            if relax(state, u, v, weight, counts):
+                edges[v] = edges[u] + 1
+                if edges[v] >= n:
+                    cycle = predecessor_cycle(state, v)
+                    if cycle is not None:
+                        return cycle, state
+                if v not in in_queue:
+                    in_queue.add(v)
+                    Q.append(v)
+    return None, state
+
+
+def DAG_shortest_paths(G, s, order=None):
+    """
+        Find shortest paths from s to all other vertices on a DAG (directed acyclic graph), works with negative edges.\n
+        order is an optional topological order of G.V (for example from a DynamicTopologicalOrder), otherwise it is computed
+    """
+    counts = instrumentation.counts()
+    state = initialize_single_source(G, s)
+    if order is None:
+        order = topological_sort(G)
+    for u in order:
+        for v, weight in G.adj(u):
+            relax(state, u, v, weight, counts)
+    return state
+
+
+def dijkstra(G, s, potential=None):
+    """
+        Find shortest paths from s to all other vertices, works only with non-negative edges.\n
+        With a potential (a dict h), every edge u -> v gets the weight weight + h[u] - h[v] instead of weight,
+        which is how johnson makes negative edges non-negative without changing the graph
+    """
+    counts = instrumentation.counts()
+    state = initialize_single_source(G, s)
+    # the queue only holds vertices that have been reached, keyed by their distance estimate
+    Q = IndexedMinHeap([(s, 0)])
     while Q.size() > 0:
         u = Q.extract_min()
-        for v, weight in G.adj(u):
-            relax(u, v)
-            Q.build_min_heap()
+        edges = G.adj(u)
+        if counts is not None:
+            counts["relaxations"] += len(edges)
+        for v, weight in edges:
+            if potential is not None:
+                weight = weight + potential[u] - potential[v]
+            # relax the edge directly with its weight, and move v up in the queue if d[v] decreased
+            if state.d[v] > state.d[u] + weight:
+                state.d[v] = state.d[u] + weight
+                state.p[v] = u
+                if v in Q:
+                    Q.decrease_key(v, state.d[v])
+                else:
+                    Q.insert(v, state.d[v])
+    return state
+
+
+def reconstruct_path(p, t):
+    """ Returns the path ending in t by following the predecessors in p (a dict) back to the source """
+    path = []
+    while t is not None:
+        path.append(t)
+        t = p[t]
+    path.reverse()
+    return path
+
+
+def shortest_path(G, s, t):
+    """
+        Find the shortest path from s to t with Dijkstra, but stops as soon as t is settled.
+        Returns the distance and the path as a list of vertices, or (sys.maxsize, []) if t can not be reached
+    """
+    # distances and predecessors are kept in dicts, so only the vertices that are reached are touched
+    counts = instrumentation.counts()
+    d = {s: 0}
+    p = {s: None}
+    Q = IndexedMinHeap([(s, 0)])
+    while Q.size() > 0:
+        u = Q.extract_min()
+        if u == t:
+            return d[t], reconstruct_path(p, t)
+        edges = G.adj(u)
+        if counts is not None:
+            counts["relaxations"] += len(edges)
+        for v, weight in edges:
+            if v not in d or d[v] > d[u] + weight:
+                d[v] = d[u] + weight
+                p[v] = u
+                if v in Q:
+                    Q.decrease_key(v, d[v])
+                else:
+                    Q.insert(v, d[v])
+    return sys.maxsize, []
+
+
+def reverse_adjacency(G):
+    """ Returns a dict where R[v] is a list of [u, weight] for all edges u -> v, that is the adjacency lists of G reversed """
+    R = {v: [] for v in G.V}
+    for u, v, weight in G.E:
+        R[v].append([u, weight])
+    return R
+
+
+def bidirectional_dijkstra(G, s, t, reverse=None):
+    """
+        Find the shortest path from s to t by running Dijkstra forwards from s and backwards from t at the same time,
+        stopping when the two searches can not find a shorter path. Works only with non-negative edges.\n
+        The reverse adjacency (from reverse_adjacency) can be given to avoid recomputing it for every query.
+        Returns the distance and the path as a list of vertices, or (sys.maxsize, []) if t can not be reached
+    """
+    if reverse is None:
+        reverse = reverse_adjacency(G)
+    if s == t:
+        return 0, [s]
+
+    # index 0 is the forward search from s, index 1 is the backward search from t
+    d = ({s: 0}, {t: 0})
+    p = ({s: None}, {t: None})
+    Q = (IndexedMinHeap([(s, 0)]), IndexedMinHeap([(t, 0)]))
+    adj = (G.adj, reverse.__getitem__)
+
+    counts = instrumentation.counts()
+    # length of the shortest path found so far, and the vertex where the two searches met on it
+    best = sys.maxsize
+    meeting = None
+
+    while Q[0].size() > 0 and Q[1].size() > 0:
+        forward_min = Q[0].key(Q[0].minimum())
+        backward_min = Q[1].key(Q[1].minimum())
+        # every path not found yet is at least as long as the sum of the two smallest keys
+        if forward_min + backward_min >= best:
+            break
+
+        # expand the search with the smallest key
+        i = 0 if forward_min <= backward_min else 1
+        u = Q[i].extract_min()
+        edges = adj[i](u)
+        if counts is not None:
+            counts["relaxations"] += len(edges)
+        for v, weight in edges:
+            if v not in d[i] or d[i][v] > d[i][u] + weight:
+                d[i][v] = d[i][u] + weight
+                p[i][v] = u
+                if v in Q[i]:
+                    Q[i].decrease_key(v, d[i][v])
+                else:
+                    Q[i].insert(v, d[i][v])
+            if v in d[1 - i] and d[i][v] + d[1 - i][v] < best:
+                best = d[i][v] + d[1 - i][v]
+                meeting = v
+
+    if meeting is None:
+        return sys.maxsize, []
+
+    # forward path s ... meeting, followed by the backward path from meeting to t
+    path = reconstruct_path(p[0], meeting)
+    v = p[1][meeting]
+    while v is not None:
+        path.append(v)
+        v = p[1][v]
+    return best, path
 
 
 def test1():
@@ -82,11 +277,14 @@ def test1():
 
     g = Graph(s, t, x, y, z)
     g.print()
-    print("Bellman-Ford returns: ", bellman_ford(g, s))
+    no_negative_cycle, state = bellman_ford(g, s)
+    print("Bellman-Ford returns: ", no_negative_cycle)
     print(f"Bellman-Ford Shortest path from {s} to...")
     for v in g.V:
         if v != s:
-            print(f"{v}: {v.d}")
+            print(f"{v}: {state.d[v]}")
+    cycle, state = bellman_ford_queue(g, s)
+    print("Queue-based Bellman-Ford finds the negative cycle: ", cycle)
 
 # test1()
 
@@ -113,11 +311,11 @@ def test2():
 
     g = Graph(r, s, t, x, y, z)
     g.print()
-    DAG_shortest_paths(g, s)
+    state = DAG_shortest_paths(g, s)
     print(f"DAG Shortest paths from {s} to...")
     for v in g.V:
         if v != s:
-            print(f"{v}: {v.d}")
+            print(f"{v}: {state.d[v]}")
 
 # test2()
 
@@ -142,10 +340,36 @@ def test3():
     z.add_edge(x, 6)
 
     g = Graph(s, t, x, y, z)
-    dijkstra(g, s)
+    state = dijkstra(g, s)
     print(f"Dijkstra Shortest paths from {s} to...")
     for v in g.V:
         if v != s:
-            print(f"{v}: {v.d}")
+            print(f"{v}: {state.d[v]}")
 
 # test3()
+
+
+def test4():
+    """ Testing point-to-point and bidirectional Dijkstra """
+    s = Vertex("s")
+    t = Vertex("t")
+    x = Vertex("x")
+    y = Vertex("y")
+    z = Vertex("z")
+
+    s.add_edge(t, 10)
+    s.add_edge(y, 5)
+    t.add_edge(x, 1)
+    t.add_edge(y, 2)
+    x.add_edge(z, 4)
+    y.add_edge(t, 3)
+    y.add_edge(x, 9)
+    y.add_edge(z, 2)
+    z.add_edge(s, 7)
+    z.add_edge(x, 6)
+
+    g = Graph(s, t, x, y, z)
+    print(f"Shortest path from {s} to {x}:", shortest_path(g, s, x))
+    print(f"Bidirectional shortest path from {s} to {x}:", bidirectional_dijkstra(g, s, x))
+
+# test4()
@@ -1,12 +1,22 @@
 """ Sorting (Divide and Conquer and in linear time) and Order Statistics """
 
-import sys
+import os
 import random
+from array import array
+from bisect import bisect_left, bisect_right
+import instrumentation
+from shared_arrays import SharedArrays, attached
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 
 def insertion_sort(A):
     """ Sorts A by inserting elements into the right place of the array, one after one """
 
+    counts = instrumentation.counts()
     for i in range(1, len(A)):
         key = A[i]
         j = i - 1
@@ -14,6 +24,10 @@ def insertion_sort(A):
             A[j + 1] = A[j]
             j -= 1
         A[j + 1] = key
+        if counts is not None:
+            # every element moved one step right was compared to key, and so was A[j] if the loop did not reach the start
+            counts["comparisons"] += i - 1 - j + (j >= 0)
+            counts["moves"] += i - 1 - j
 
 
 def merge(A, start_index, split_index, end_index):
@@ -27,26 +41,15 @@ def merge(A, start_index, split_index, end_index):
     m = end_index - split_index
 
     # left and right subarrays
-    L = [0] * (n + 1)
-    R = [0] * (m + 1)
-
-    # fills the left subarray [0 ... split_index]
-    for i in range(n):
-        L[i] = A[start_index + i]
-
-    # fills the right subarray [split_index + 1 ... end_index]
-    for i in range(m):
-        R[i] = A[split_index + 1 + i]
-
-    # last element of each subarray = inf to make sure
-    # all elements from both sub-arrays gets inserted into the main array by the comparison below
-    L[n] = R[m] = sys.maxsize
+    L = A[start_index:split_index + 1]
+    R = A[split_index + 1:end_index + 1]
 
     # indexes for left and right subarray, the indexes represent the next element to extract from subarray
     # into the main array
     i = j = 0
+    k = start_index
 
-    for k in range(start_index, end_index + 1):
+    while i < n and j < m:
         # If item L[i] in left subarray is less than or equal to element R[j] in right array,
         # add L[i] to main array, else do the opposite.
         # Also increase index to the subarray we got the element from, since the element now is
@@ -57,6 +60,17 @@ def merge(A, start_index, split_index, end_index):
         else:
             A[k] = R[j]
             j += 1
+        k += 1
+
+    # one of the subarrays is empty, so the rest of the other is copied without comparing
+    # (no sentinel is needed, such that any comparable elements can be merged)
+    A[k:end_index + 1] = L[i:] + R[j:]
+
+    counts = instrumentation.counts()
+    if counts is not None:
+        # one comparison for every element written back to A before one subarray was empty
+        counts["comparisons"] += i + j
+        counts["moves"] += 2 * (end_index - start_index + 1)
 
 
 def merge_sort(A, start_index, end_index):
@@ -69,6 +83,237 @@ def merge_sort(A, start_index, end_index):
         merge(A, start_index, split_index, end_index)
 
 
+# number of wins in a row for one run before adaptive_merge_sort starts galloping
+MIN_GALLOP = 7
+
+
+def _gallop(x, A, start, end, right):
+    """
+        Returns the index of the first element in the sorted A[start ... end - 1] that is larger than x (larger than or
+        equal to x if not right), by checking A[start], A[start + 1], A[start + 3], A[start + 7] ... and then
+        bisecting between the last two, which is fast when the index is close to start
+    """
+    last = 0
+    offset = 0
+    while offset < end - start and (not x < A[start + offset] if right else A[start + offset] < x):
+        last = offset + 1
+        offset = 2 * offset + 1
+    return (bisect_right if right else bisect_left)(A, x, start + last, min(start + offset, end))
+
+
+def _gallop_back(x, A, start, end, right):
+    """ Same as _gallop, but checks A[end - 1], A[end - 2], A[end - 4], A[end - 8] ..., for an index close to end """
+    last = 0
+    offset = 0
+    while offset < end - start and (x < A[end - 1 - offset] if right else not A[end - 1 - offset] < x):
+        last = offset + 1
+        offset = 2 * offset + 1
+    return (bisect_right if right else bisect_left)(A, x, max(end - offset, start), end - last)
+
+
+def _count_run(A, start, end):
+    """
+        Returns the length of the run starting at A[start], which is either non-descending or strictly descending.
+        A descending run is reversed, which keeps the sort stable since it has no equal elements
+    """
+    run_end = start + 1
+    if run_end == end:
+        return 1
+    if A[run_end] < A[start]:
+        while run_end < end and A[run_end] < A[run_end - 1]:
+            run_end += 1
+        A[start:run_end] = A[start:run_end][::-1]
+    else:
+        while run_end < end and not A[run_end] < A[run_end - 1]:
+            run_end += 1
+    return run_end - start
+
+
+def _binary_insertion_sort(A, start, end, sorted_end):
+    """ Sorts A[start ... end - 1] by inserting the elements after A[start ... sorted_end - 1] (which is sorted) one by one """
+    for i in range(sorted_end, end):
+        x = A[i]
+        position = bisect_right(A, x, start, i)
+        A[position + 1:i + 1] = A[position:i]
+        A[position] = x
+
+
+def _merge_low(A, buffer, start, split, end):
+    """ Merges A[start ... split - 1] and A[split ... end - 1], where the left run is copied to buffer and is the shortest """
+    n = split - start
+    buffer[:n] = A[start:split]
+    i = 0
+    j = split
+    k = start
+    while i < n and j < end:
+        # one element at a time, until one run has won MIN_GALLOP times in a row
+        left_wins = right_wins = 0
+        while True:
+            if A[j] < buffer[i]:
+                A[k] = A[j]
+                j += 1
+                k += 1
+                right_wins += 1
+                left_wins = 0
+                if j == end or right_wins == MIN_GALLOP:
+                    break
+            else:
+                A[k] = buffer[i]
+                i += 1
+                k += 1
+                left_wins += 1
+                right_wins = 0
+                if i == n or left_wins == MIN_GALLOP:
+                    break
+
+        # galloping, moving all elements of one run that go before the next element of the other run at once
+        while i < n and j < end:
+            count = _gallop(A[j], buffer, i, n, True) - i
+            A[k:k + count] = buffer[i:i + count]
+            i += count
+            k += count
+            if i == n:
+                break
+            right_count = _gallop(buffer[i], A, j, end, False) - j
+            A[k:k + right_count] = A[j:j + right_count]
+            j += right_count
+            k += right_count
+            if count < MIN_GALLOP and right_count < MIN_GALLOP:
+                break
+
+    # the rest of the right run is already in place
+    A[k:k + n - i] = buffer[i:n]
+
+
+def _merge_high(A, buffer, start, split, end):
+    """ Merges A[start ... split - 1] and A[split ... end - 1] from the back, where the right run is copied to buffer and is the shortest """
+    m = end - split
+    buffer[:m] = A[split:end]
+    i = split - 1
+    j = m - 1
+    k = end - 1
+    while i >= start and j >= 0:
+        left_wins = right_wins = 0
+        while True:
+            if buffer[j] < A[i]:
+                A[k] = A[i]
+                i -= 1
+                k -= 1
+                left_wins += 1
+                right_wins = 0
+                if i < start or left_wins == MIN_GALLOP:
+                    break
+            else:
+                A[k] = buffer[j]
+                j -= 1
+                k -= 1
+                right_wins += 1
+                left_wins = 0
+                if j < 0 or right_wins == MIN_GALLOP:
+                    break
+
+        while i >= start and j >= 0:
+            # elements of the left run that are larger than the last of the right run
+            first = _gallop_back(buffer[j], A, start, i + 1, True)
+            count = i + 1 - first
+            A[k - count + 1:k + 1] = A[first:i + 1]
+            i -= count
+            k -= count
+            if i < start:
+                break
+            # elements of the right run that are larger than or equal to the last of the left run
+            first = _gallop_back(A[i], buffer, 0, j + 1, False)
+            right_count = j + 1 - first
+            A[k - right_count + 1:k + 1] = buffer[first:j + 1]
+            j -= right_count
+            k -= right_count
+            if count < MIN_GALLOP and right_count < MIN_GALLOP:
+                break
+
+    # the rest of the left run is already in place
+    A[start:start + j + 1] = buffer[:j + 1]
+
+
+def _merge_runs(A, buffer, start, split, end):
+    """ Merges the neighbouring sorted runs A[start ... split - 1] and A[split ... end - 1] """
+    # elements at the start of the left run and the end of the right run that are already in place are skipped
+    start = _gallop(A[split], A, start, split, True)
+    if start == split:
+        return
+    end = _gallop_back(A[split - 1], A, split, end, False)
+    if split - start <= end - split:
+        _merge_low(A, buffer, start, split, end)
+    else:
+        _merge_high(A, buffer, start, split, end)
+
+
+def _min_run(n, cutoff):
+    """ Returns a run length between cutoff and 2 * cutoff, such that n / length is a power of two or just below one """
+    extra = 0
+    while n >= 2 * cutoff:
+        extra |= n & 1
+        n >>= 1
+    return n + extra
+
+
+def adaptive_merge_sort(A, key=None, cutoff=32):
+    """
+        Stable merge sort that takes advantage of order that is already in A (like Timsort), sorting A in place.
+        A is split into runs that are already sorted (descending runs are reversed), and runs shorter than about cutoff
+        are extended with insertion sort. The runs are merged in an order that keeps the merges balanced, through one
+        buffer of n / 2 elements, and when one run wins many comparisons in a row the merge switches to galloping
+        (exponential search) and moves many elements at once. Sorted or nearly sorted input takes close to linear time.\n
+        With key, the elements are sorted by key(element), which is only computed once for every element
+    """
+    if key is not None:
+        # the index makes elements with equal keys keep their order, without comparing the elements themselves
+        decorated = [(key(x), i) for i, x in enumerate(A)]
+        adaptive_merge_sort(decorated, cutoff=cutoff)
+        A[:] = [A[i] for k, i in decorated]
+        return
+
+    n = len(A)
+    if n < 2:
+        return
+    min_run = _min_run(n, cutoff)
+    buffer = [None] * (n // 2 + 1)
+    # stack of runs (start, length) waiting to be merged, where every run is shorter than the sum of the two below it
+    runs = []
+    run_count = 0
+    start = 0
+    while start < n:
+        run_count += 1
+        length = _count_run(A, start, n)
+        if length < min_run:
+            end = min(start + min_run, n)
+            _binary_insertion_sort(A, start, end, start + length)
+            length = end - start
+        runs.append((start, length))
+        start += length
+
+        # merges runs until the stack is balanced again
+        while len(runs) > 1:
+            i = len(runs) - 2
+            if (i > 0 and runs[i - 1][1] <= runs[i][1] + runs[i + 1][1]) or (i > 1 and runs[i - 2][1] <= runs[i - 1][1] + runs[i][1]):
+                if runs[i - 1][1] < runs[i + 1][1]:
+                    i -= 1
+            elif runs[i][1] > runs[i + 1][1]:
+                break
+            _merge_runs(A, buffer, runs[i][0], runs[i + 1][0], runs[i + 1][0] + runs[i + 1][1])
+            runs[i:i + 2] = [(runs[i][0], runs[i][1] + runs[i + 1][1])]
+
+    while len(runs) > 1:
+        i = len(runs) - 2
+        if i > 0 and runs[i - 1][1] < runs[i + 1][1]:
+            i -= 1
+        _merge_runs(A, buffer, runs[i][0], runs[i + 1][0], runs[i + 1][0] + runs[i + 1][1])
+        runs[i:i + 2] = [(runs[i][0], runs[i][1] + runs[i + 1][1])]
+
+    counts = instrumentation.counts()
+    if counts is not None:
+        counts["runs"] += run_count
+
+
 def partion(A, start_index, end_index):
     """ Returns an index which splits A into two partitions """
 
@@ -88,6 +333,11 @@ def partion(A, start_index, end_index):
     # A[start_index ... i + 1] and A[i + 2 ... end_index]
     A[i + 1], A[end_index] = A[end_index], A[i+1]
 
+    counts = instrumentation.counts()
+    if counts is not None:
+        counts["comparisons"] += end_index - start_index
+        counts["swaps"] += i + 2 - start_index
+
     return i + 1
 
 
@@ -123,6 +373,126 @@ def randomized_quicksort(A, start_index, end_index):
         randomized_quicksort(A, pivot + 1, end_index)
 
 
+def _median_of_three(A, i, j, k):
+    """ Returns the index of the median of A[i], A[j] and A[k] """
+    if A[i] < A[j]:
+        if A[j] < A[k]:
+            return j
+        return k if A[i] < A[k] else i
+    if A[i] < A[k]:
+        return i
+    return k if A[j] < A[k] else j
+
+
+def _choose_pivot(A, start_index, end_index):
+    """
+        Returns the index of a pivot for A[start_index ... end_index], the median of the first, middle and last
+        element, or for large subarrays the median of three such medians (ninther), which is close to the real median
+    """
+    n = end_index - start_index + 1
+    middle = start_index + n // 2
+    if n > 40:
+        step = n // 8
+        return _median_of_three(
+            A,
+            _median_of_three(A, start_index, start_index + step, start_index + 2 * step),
+            _median_of_three(A, middle - step, middle, middle + step),
+            _median_of_three(A, end_index - 2 * step, end_index - step, end_index),
+        )
+    return _median_of_three(A, start_index, middle, end_index)
+
+
+def three_way_partition(A, start_index, end_index, pivot):
+    """
+        Partitions A[start_index ... end_index] around the value pivot (Dutch national flag), and returns (lt, gt) such that
+        A[start_index ... lt - 1] < pivot, A[lt ... gt] == pivot and A[gt + 1 ... end_index] > pivot.
+        All elements equal to the pivot end up in the middle, so they are never partitioned again
+    """
+    lt = start_index
+    i = start_index
+    gt = end_index
+    while i <= gt:
+        x = A[i]
+        if x < pivot:
+            A[i] = A[lt]
+            A[lt] = x
+            lt += 1
+            i += 1
+        elif pivot < x:
+            A[i] = A[gt]
+            A[gt] = x
+            gt -= 1
+        else:
+            i += 1
+    return lt, gt
+
+
+def heapsort(A, start_index, end_index):
+    """ Sorts A[start_index ... end_index] in place with a max-heap, in O(n log n) time for any input """
+    n = end_index - start_index + 1
+
+    def sift_down(i, size):
+        # i is an index in the heap, which is stored in A from start_index
+        x = A[start_index + i]
+        while True:
+            child = 2 * i + 1
+            if child >= size:
+                break
+            if child + 1 < size and A[start_index + child] < A[start_index + child + 1]:
+                child += 1
+            if not x < A[start_index + child]:
+                break
+            A[start_index + i] = A[start_index + child]
+            i = child
+        A[start_index + i] = x
+
+    for i in range(n // 2 - 1, -1, -1):
+        sift_down(i, n)
+    # moves the largest element to the end of the heap, and makes the heap one smaller
+    for size in range(n - 1, 0, -1):
+        A[start_index], A[start_index + size] = A[start_index + size], A[start_index]
+        sift_down(0, size)
+
+
+def introsort(A, start_index=0, end_index=None, cutoff=16):
+    """
+        Quicksort that is O(n log n) for every input: the pivot is a median of three (or ninther), the partitioning
+        is three-way so equal elements are handled once, only the smaller side is sorted recursively (the larger
+        side is sorted in a loop, so the recursion depth is at most log n), subarrays with at most cutoff elements are
+        sorted with insertion sort, and if the partitioning goes deeper than 2 log n it switches to heapsort
+    """
+    if end_index is None:
+        end_index = len(A) - 1
+    if end_index <= start_index:
+        return
+    depth_limit = 2 * (end_index - start_index + 1).bit_length()
+    _introsort(A, start_index, end_index, cutoff, depth_limit)
+
+
+def _introsort(A, start_index, end_index, cutoff, depth_limit):
+    """ Sorts A[start_index ... end_index] for introsort, with at most depth_limit more levels of partitioning """
+    while end_index - start_index + 1 > cutoff:
+        if depth_limit == 0:
+            counts = instrumentation.counts()
+            if counts is not None:
+                counts["heapsort_fallbacks"] += 1
+            heapsort(A, start_index, end_index)
+            return
+        depth_limit -= 1
+
+        pivot = A[_choose_pivot(A, start_index, end_index)]
+        lt, gt = three_way_partition(A, start_index, end_index, pivot)
+        if lt - start_index < end_index - gt:
+            _introsort(A, start_index, lt - 1, cutoff, depth_limit)
+            start_index = gt + 1
+        else:
+            _introsort(A, gt + 1, end_index, cutoff, depth_limit)
+            end_index = lt - 1
+
+    if start_index < end_index:
+        _binary_insertion_sort(A, start_index, end_index + 1, start_index + 1)
+
+
 def randomized_select(A, start_index, end_index, order):
     """ Returns the element in A that is larger than exactly (order - 1) other elements of A """
 
@@ -142,28 +512,105 @@ def randomized_select(A, start_index, end_index, order):
         return randomized_select(A, pivot + 1, end_index, order - k)
 
 
-def counting_sort(A, max_int_value):
-    """ Sorts integers in range [0 ... max_int_value] by counting """
+def counting_sort(A, max_int_value=None, key=None, min_int_value=None):
+    """
+        Sorts integers in range [min_int_value ... max_int_value] by counting, and returns them as a new list.
+        The range is computed from A if it is not given, so negative integers work too, and the count array only
+        covers the integers between the smallest and the largest.\n
+        With key, A can contain any elements, which are sorted stably by the integer key(element).
+        Integers without key are counted with numpy if it is installed (a numpy array is returned for a numpy array)
+    """
+
+    n = len(A)
+    keys = A if key is None else [key(x) for x in A]
+    if n == 0:
+        return A[:0] if np is not None and isinstance(A, np.ndarray) else []
+    if max_int_value is None:
+        max_int_value = max(keys)
+    if min_int_value is None:
+        min_int_value = min(keys)
+    size = max_int_value - min_int_value + 1
+
+    counts = instrumentation.counts()
+    if counts is not None:
+        counts["moves"] += n
+
+    if np is not None and key is None:
+        values = np.asarray(A)
+        if values.dtype.kind in "iu":
+            # C[i] is the number of elements equal to min_int_value + i, and every value is repeated that many times
+            C = np.bincount(values - min_int_value, minlength=size)
+            B = np.repeat(np.arange(min_int_value, max_int_value + 1, dtype=values.dtype), C)
+            return B if isinstance(A, np.ndarray) else B.tolist()
 
     # B stores the result, C counts elements
-    B = [0] * len(A)
-    C = [0] * (max_int_value + 1)
+    B = [None] * n
+    C = [0] * size
 
-    # computes C, where C[i] contains the number of elements equal to i
-    for i in range(len(A)):
-        C[A[i]] += 1
+    # computes C, where C[i] contains the number of elements equal to min_int_value + i
+    for k in keys:
+        C[k - min_int_value] += 1
 
-    # makes C contain the number of elements less than or equal to i
-    for i in range(1, max_int_value + 1):
+    # makes C contain the number of elements less than or equal to min_int_value + i
+    for i in range(1, size):
         C[i] += C[i - 1]
 
-    for i in range(len(A) - 1, 0, -1):
-        B[C[A[i]] - 1] = A[i]
-        C[A[i]] -= 1
+    # places the elements from the back, such that equal elements keep their order
+    for i in range(n - 1, -1, -1):
+        k = keys[i] - min_int_value
+        C[k] -= 1
+        B[C[k]] = A[i]
 
     return B
 
 
+def radix_sort(A, key=None, digit_bits=None):
+    """
+        LSD radix sort of integers (or of any elements by the integer key(element)), returns them as a new list.
+        The elements are sorted stably by digit_bits bits of the key at a time, from the least significant digit,
+        in O((n + 2^digit_bits) * bits / digit_bits) time, where bits is the length of the largest key. Negative
+        keys are sorted by their distance from the smallest key.\n
+        With numpy installed, every digit is counted and scattered in bulk (a numpy array is returned for a numpy array).
+        digit_bits defaults to 16 with numpy and 8 without
+    """
+
+    n = len(A)
+    keys = A if key is None else [key(x) for x in A]
+    if n < 2:
+        return A.copy() if np is not None and isinstance(A, np.ndarray) else list(A)
+    smallest = int(min(keys))
+    largest = int(max(keys))
+    bits = (largest - smallest).bit_length()
+    use_numpy = np is not None and -2 ** 63 <= smallest and largest < 2 ** 63 and largest - smallest < 2 ** 63
+    if digit_bits is None:
+        digit_bits = 16 if use_numpy else 8
+    mask = (1 << digit_bits) - 1
+
+    if use_numpy:
+        shifted = np.asarray(keys, dtype=np.int64) - smallest
+        order = np.arange(n)
+        digit_type = np.uint8 if digit_bits <= 8 else np.uint16 if digit_bits <= 16 else np.int64
+        for shift in range(0, bits, digit_bits):
+            # a stable sort of small unsigned digits is a counting sort in numpy
+            step = np.argsort(((shifted >> shift) & mask).astype(digit_type), kind="stable")
+            shifted = shifted[step]
+            order = order[step]
+        counts = instrumentation.counts()
+        if counts is not None:
+            counts["moves"] += n * ((bits + digit_bits - 1) // digit_bits)
+        if isinstance(A, np.ndarray):
+            return A[order]
+        if key is None:
+            return (shifted + smallest).tolist()
+        return [A[i] for i in order.tolist()]
+
+    # pairs of (key - smallest, element), sorted with one stable counting sort for every digit
+    items = [(k - smallest, x) for k, x in zip(keys, A)]
+    for shift in range(0, bits, digit_bits):
+        items = counting_sort(items, mask, key=lambda item: (item[0] >> shift) & mask, min_int_value=0)
+    return [x for k, x in items]
+
+
 def bucket_sort(A):
     """ 
         Sorts A using bucket-distribution, assumes that the elements of A have a
@@ -189,6 +636,139 @@ def bucket_sort(A):
     return result
 
 
+def _bucket_counts(task):
+    """ Returns the number of elements in every bucket for the input elements start ... end - 1 """
+    start, end, splitters = task
+    (source, target), _ = attached()
+    typecode = source.format
+    if np is not None:
+        values = np.frombuffer(source, dtype=typecode)[start:end]
+        buckets = np.searchsorted(np.array(splitters, dtype=typecode), values, side="right")
+        return np.bincount(buckets, minlength=len(splitters) + 1).tolist()
+    counts = [0] * (len(splitters) + 1)
+    for x in source[start:end]:
+        counts[bisect_right(splitters, x)] += 1
+    return counts
+
+
+def _scatter(task):
+    """ Writes the input elements start ... end - 1 to their buckets in the output, from the given offset of every bucket """
+    start, end, splitters, offsets = task
+    (source, target), _ = attached()
+    typecode = source.format
+    if np is not None:
+        values = np.frombuffer(source, dtype=typecode)[start:end]
+        output = np.frombuffer(target, dtype=typecode)
+        buckets = np.searchsorted(np.array(splitters, dtype=typecode), values, side="right")
+        # groups the elements by bucket (a counting sort for small bucket numbers), then every group is one slice of the output
+        if len(splitters) < 2 ** 16:
+            values = values[np.argsort(buckets.astype(np.uint16), kind="stable")]
+        else:
+            values = values[np.argsort(buckets, kind="stable")]
+        position = 0
+        for bucket, count in enumerate(np.bincount(buckets, minlength=len(splitters) + 1).tolist()):
+            output[offsets[bucket]:offsets[bucket] + count] = values[position:position + count]
+            position += count
+        return end - start
+    offsets = list(offsets)
+    for x in source[start:end]:
+        bucket = bisect_right(splitters, x)
+        target[offsets[bucket]] = x
+        offsets[bucket] += 1
+    return end - start
+
+
+def _sort_bucket(task):
+    """ Sorts the output elements start ... end - 1 in place """
+    start, end = task
+    (source, target), _ = attached()
+    typecode = source.format
+    if np is not None:
+        np.frombuffer(target, dtype=typecode)[start:end].sort()
+    else:
+        values = target[start:end].tolist()
+        values.sort()
+        target[start:end] = array(typecode, values)
+    return end - start
+
+
+def _sample_sort_typecode(A):
+    """ Returns the typecode ('q' or 'd') the elements of A can be stored as in shared memory, or None """
+    if np is not None and isinstance(A, np.ndarray):
+        if A.dtype.kind == "i" or (A.dtype.kind == "u" and A.dtype.itemsize < 8):
+            return "q"
+        return "d" if A.dtype.kind == "f" else None
+    if all(type(x) is int for x in A):
+        return "q" if -2 ** 63 <= min(A) and max(A) < 2 ** 63 else None
+    if all(type(x) is float for x in A):
+        return "d"
+    return None
+
+
+def parallel_sample_sort(A, processes=None, threshold=100000, oversampling=32):
+    """
+        Sorts the integers or floats in A (a list or numpy array) in place with a pool of worker processes.
+        processes - 1 splitters are picked from a sorted random sample of oversampling elements per process, which
+        split the values into one bucket per process of about the same size. Every process counts how many of its
+        part of the input go to each bucket, then writes them to their place in the output, and then sorts one bucket,
+        so the buckets end up sorted one after another. The input and output are arrays in shared memory, so the
+        data is never pickled.\n
+        Inputs with fewer than threshold elements (or other elements than integers and floats) are sorted serially,
+        with numpy for numpy arrays and with list.sort for lists
+    """
+    n = len(A)
+    if processes is None:
+        processes = os.cpu_count() or 1
+    typecode = _sample_sort_typecode(A) if processes > 1 and n >= threshold else None
+    if typecode is None:
+        # numpy arrays and lists both have an in-place sort
+        A.sort()
+        return
+
+    # splitters[i] is the smallest value of bucket i + 1, since bisect_right and searchsorted(side="right") put values
+    # equal to a splitter in the bucket after it (bucket 0 takes the values below splitters[0])
+    sample = sorted(A[i] for i in random.sample(range(n), min(n, processes * oversampling)))
+    splitters = [sample[(i * len(sample)) // processes] for i in range(1, processes)]
+    splitters = [x.item() if hasattr(x, "item") else x for x in splitters]
+    chunk_size = -(-n // processes)
+    chunks = [(start, min(start + chunk_size, n)) for start in range(0, n, chunk_size)]
+
+    # the input and the output
+    with SharedArrays([(typecode, n), (typecode, n)]) as shared:
+        if np is not None:
+            source = np.frombuffer(shared[0], dtype=typecode)
+            source[:] = A
+            del source
+        else:
+            shared[0][:] = array(typecode, A)
+
+        with shared.pool(processes) as pool:
+            counts = pool.map(_bucket_counts, [(start, end, splitters) for start, end in chunks])
+
+            # offsets[c][b] is where the first element of chunk c in bucket b is written
+            offsets = []
+            bucket_starts = []
+            position = 0
+            for bucket in range(processes):
+                bucket_starts.append(position)
+                for c in range(len(chunks)):
+                    if bucket == 0:
+                        offsets.append([0] * processes)
+                    offsets[c][bucket] = position
+                    position += counts[c][bucket]
+            bucket_starts.append(n)
+
+            pool.map(_scatter, [(start, end, splitters, offsets[c]) for c, (start, end) in enumerate(chunks)])
+            pool.map(_sort_bucket, [(bucket_starts[b], bucket_starts[b + 1]) for b in range(processes)])
+
+        if np is not None:
+            target = np.frombuffer(shared[1], dtype=typecode)
+            A[:] = target if isinstance(A, np.ndarray) else target.tolist()
+            del target
+        else:
+            A[:] = shared[1].tolist()
+
+
 def bisect(A, start_index, end_index, element):
     """ Returns the element's index in A, returns None if the element is not in A. Assumes A is sorted. """
     # also called binary search
@@ -247,6 +827,7 @@ def test3():
     a = [1, 4, 7, 5, 3, 2, 5, 5, 5, 3, 4, 3, 8,
          7, 6, 5, 21, 2, 1, 2, 23, 13, 15, 0, 2]
     print(counting_sort(a, 23))
+    print(counting_sort([3, -1, 4, -1, -5, 9, 2, -6]))
 
 # test3()
 
@@ -278,4 +859,47 @@ def test6():
     print(bisect_iterative(a, 332))
 
 
-test6()
+# test6()
+
+
+def test7():
+    """ Test for radix-sort """
+    a = [170, 45, 75, -90, 802, 24, 2, 66, -1]
+    print(radix_sort(a))
+    people = [("Ola", 32), ("Kari", 25), ("Per", 32), ("Nina", 19)]
+    print(radix_sort(people, key=lambda person: person[1], digit_bits=4))
+
+# test7()
+
+
+def test8():
+    """ Test for adaptive merge-sort """
+    a = [1, 2, 3, 10, 9, 8, 4, 5, 6, 7, 0, 0.5, -1]
+    adaptive_merge_sort(a, cutoff=2)
+    print(a)
+    words = ["pear", "fig", "apple", "kiwi", "banana"]
+    adaptive_merge_sort(words, key=len)
+    print(words)
+
+# test8()
+
+
+def test9():
+    """ Test for introsort and heapsort """
+    a = [2, 8, 7, 1, 6, 3, 5, 6, 4, 6, 6, 0]
+    introsort(a, cutoff=2)
+    print(a)
+    b = list(range(10, 0, -1))
+    heapsort(b, 2, 7)
+    print(b)
+
+# test9()
+
+
+def test10():
+    """ Test for parallel sample-sort """
+    a = [random.randint(0, 1000) for _ in range(20)]
+    parallel_sample_sort(a, processes=4, threshold=10)
+    print(a)
+
+# test10()